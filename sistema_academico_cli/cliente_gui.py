@@ -51,12 +51,16 @@ import socket
 import os
 import ctypes
 import threading
+import concurrent.futures
 import multiprocessing
 import time
 import struct
 import calendar
 import re
 import json
+import functools
+import collections
+import itertools
 from datetime import datetime
 
 # ==============================================================================
@@ -66,6 +70,19 @@ from datetime import datetime
 # Configurar calendário para padrão brasileiro (semana começa na Segunda-feira)
 calendar.setfirstweekday(calendar.MONDAY)
 
+# Formato de data dd/mm/aaaa usado nos formulários (compilado uma única vez)
+_DATE_RE = re.compile(r'^\d{2}/\d{2}/\d{4}$')
+
+# Uma linha de LIST_ALUNOS_POR_TURMA; as notas são opcionais (respostas antigas não as trazem)
+_ALUNO_LINE_RE = re.compile(
+    r'Matrícula:\s*(?P<mat>\d+),\s*Nome:\s*(?P<nome>[^,\n]*)'
+    r'(?:,\s*NP1:\s*(?P<np1>[-\d.]+))?'
+    r'(?:,\s*NP2:\s*(?P<np2>[-\d.]+))?'
+    r'(?:,\s*PIM:\s*(?P<pim>[-\d.]+))?'
+    r'(?:,\s*Média:\s*(?P<media>[-\d.]+))?'
+    r'(?:,\s*Exame:\s*(?P<exame>[-\d.]+))?'
+)
+
 # ==============================================================================
 # LOCKS E VARIÁVEIS GLOBAIS
 # ==============================================================================
@@ -147,9 +164,58 @@ DEFAULT_FONTS = {
     'icon_button': ("Helvetica", 12)
 }
 
+# Conteúdo já decodificado dos arquivos .dat, por caminho: (mtime_ns, tamanho, dados)
+_dat_cache = {}
+
+def _assinatura_arquivo(path):
+    """(mtime_ns, tamanho) do arquivo, ou None se ele não existir"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+# Arquivos de uma pasta de atividades, por caminho: (assinatura da pasta, {nome: (tamanho, mtime)})
+_pasta_cache = {}
+
+def listar_arquivos_pasta(pasta):
+    """{nome: (tamanho, mtime)} dos arquivos da pasta, lidos com um único os.scandir.
+    O resultado é reaproveitado enquanto a pasta não mudar (arquivo novo ou removido
+    altera o mtime da pasta). Reescrever um arquivo já existente não altera a pasta:
+    quem grava nela deve descartar _pasta_cache[pasta]. Pasta inexistente retorna {}."""
+    assinatura = _assinatura_arquivo(pasta)
+    if assinatura is None:
+        return {}
+    entrada = _pasta_cache.get(pasta)
+    if entrada and entrada[0] == assinatura:
+        return entrada[1]
+    arquivos = {}
+    try:
+        with os.scandir(pasta) as it:
+            for e in it:
+                if e.is_file():
+                    st = e.stat()
+                    arquivos[e.name] = (st.st_size, st.st_mtime)
+    except OSError:
+        return {}
+    _pasta_cache[pasta] = (assinatura, arquivos)
+    return arquivos
+
+def _tamanho_legivel(n):
+    """Tamanho em bytes formatado como B, KB ou MB"""
+    unidade = min((n.bit_length() - 1) // 10, 2) if n > 0 else 0
+    if unidade == 0:
+        return f"{n} B"
+    return f"{n / (1 << (10 * unidade)):.1f} {('KB', 'MB')[unidade - 1]}"
+
 def load_notas_dat(path=None):
     if path is None:
         path = os.path.join('uploads','notas.dat')
+    # Reaproveitar o mapa já lido enquanto o arquivo não mudar
+    assinatura = _assinatura_arquivo(path)
+    entrada = _dat_cache.get(path)
+    if assinatura is not None and entrada and entrada[0] == assinatura:
+        return dict(entrada[1])
     rec_fmt = '<i4f'  # int32 matricula, 4 floats: np1,np2,pim,media
     rec_size = struct.calcsize(rec_fmt)
     notas = {}
@@ -178,53 +244,71 @@ def load_notas_dat(path=None):
         pass
     except Exception:
         pass
-    return notas
+    if assinatura is not None:
+        _dat_cache[path] = (assinatura, notas)
+    return dict(notas)
 
 
+# Registros anexados a um arquivo de presenças antes de reescrevê-lo sem os substituídos
+PRESENCAS_COMPACTAR_APOS = 1000
+# path -> registros anexados desde a última compactação (neste processo)
+_presencas_anexadas = {}
+
 def save_presencas_dat(id_turma: str, date_str: str, presencas: list):
     """Save presences for a turma and date into uploads/presencas_turma_{id}.dat as binary records.
 
     Records: struct '<i10sB' -> matricula:int32, date:10s (DD/MM/YYYY), presente:uint8 (1/0)
-    The function will merge/update entries for the same matricula+date and write atomically.
+    Only the given records are appended (the file works as a journal: the last record
+    for a matricula+date wins when reading). After PRESENCAS_COMPACTAR_APOS appended
+    records the file is compacted by compact_presencas_dat.
     """
     os.makedirs('uploads', exist_ok=True)
     path = os.path.join('uploads', f'presencas_turma_{id_turma}.dat')
     rec_fmt = '<i10sB'
     rec_size = struct.calcsize(rec_fmt)
+    dbytes = date_str.encode('ascii')[:10].ljust(10, b'\x00')
 
-    # Load existing into dict keyed by (matricula, date)
-    existing = {}
-    if os.path.exists(path):
+    # Records for the new presencas (list of dicts with matricula/presente)
+    registros = []
+    for p in presencas:
         try:
-            with open(path, 'rb') as f:
-                data = f.read()
-            if len(data) % rec_size == 0:
-                for i in range(0, len(data), rec_size):
-                    chunk = data[i:i+rec_size]
-                    m, dbytes, pres = struct.unpack(rec_fmt, chunk)
-                    d = dbytes.decode('ascii', errors='ignore').rstrip('\x00')
-                    existing[(int(m), d)] = bool(pres)
+            registros.append(struct.pack(rec_fmt, int(p.get('matricula')), dbytes,
+                                         1 if p.get('presente') else 0))
         except Exception:
-            existing = {}
+            continue
 
-    # Update with new presencas (list of dicts with matricula/presente)
-    for p in presencas:
+    with presenca_lock:
         try:
-            m = int(p.get('matricula'))
-            pres = bool(p.get('presente'))
-            existing[(m, date_str)] = pres
+            with open(path, 'ab') as f:
+                # Descartar um registro incompleto no fim (anexação interrompida)
+                # para que os novos fiquem alinhados
+                tamanho = f.tell()
+                if tamanho % rec_size:
+                    f.truncate(tamanho - tamanho % rec_size)
+                f.write(b"".join(registros))
         except Exception:
-            continue
+            return False
+        anexadas = _presencas_anexadas.get(path, 0) + len(registros)
+        _presencas_anexadas[path] = anexadas
+    if anexadas >= PRESENCAS_COMPACTAR_APOS:
+        compact_presencas_dat(id_turma)
+    return True
+
 
-    # Write atomically
+def compact_presencas_dat(id_turma: str):
+    """Rewrite uploads/presencas_turma_{id}.dat keeping only the latest record of each
+    matricula+date (atomically, via a .tmp file). Returns True on success."""
+    path = os.path.join('uploads', f'presencas_turma_{id_turma}.dat')
+    rec_fmt = '<i10sB'
     tmp = path + '.tmp'
     with presenca_lock:
         try:
             with open(tmp, 'wb') as f:
-                for (m, d), pres in existing.items():
-                    dbytes = d.encode('ascii')[:10].ljust(10, b'\x00')
-                    f.write(struct.pack(rec_fmt, int(m), dbytes, 1 if pres else 0))
+                for r in read_presencas_dat(id_turma):
+                    dbytes = r['date'].encode('ascii')[:10].ljust(10, b'\x00')
+                    f.write(struct.pack(rec_fmt, r['matricula'], dbytes, 1 if r['presente'] else 0))
             os.replace(tmp, path)
+            _presencas_anexadas[path] = 0
             return True
         except Exception:
             try:
@@ -237,26 +321,34 @@ def save_presencas_dat(id_turma: str, date_str: str, presencas: list):
 def read_presencas_dat(id_turma: str):
     """Read all presence records for a turma from uploads/presencas_turma_{id}.dat.
 
-    Returns a list of dicts: {'matricula': int, 'date': 'DD/MM/YYYY', 'presente': bool}
+    Returns a list of dicts: {'matricula': int, 'date': 'DD/MM/YYYY', 'presente': bool},
+    one per matricula+date (later records in the file override earlier ones).
     """
     path = os.path.join('uploads', f'presencas_turma_{id_turma}.dat')
     rec_fmt = '<i10sB'
     rec_size = struct.calcsize(rec_fmt)
     result = []
-    if not os.path.exists(path):
+    assinatura = _assinatura_arquivo(path)
+    if assinatura is None:
         return result
+    # Reaproveitar os registros já decodificados enquanto o arquivo não mudar
+    entrada = _dat_cache.get(path)
+    if entrada and entrada[0] == assinatura:
+        return list(entrada[1])
     try:
         with open(path, 'rb') as f:
             data = f.read()
-        if len(data) % rec_size == 0:
-            for i in range(0, len(data), rec_size):
-                chunk = data[i:i+rec_size]
-                m, dbytes, pres = struct.unpack(rec_fmt, chunk)
-                d = dbytes.decode('ascii', errors='ignore').rstrip('\x00')
-                result.append({'matricula': int(m), 'date': d, 'presente': bool(pres)})
+        # Um registro incompleto no fim (anexação interrompida) é ignorado
+        registros = {}
+        for i in range(0, len(data) - len(data) % rec_size, rec_size):
+            m, dbytes, pres = struct.unpack_from(rec_fmt, data, i)
+            d = dbytes.decode('ascii', errors='ignore').rstrip('\x00')
+            registros[(int(m), d)] = bool(pres)
+        result = [{'matricula': m, 'date': d, 'presente': pres} for (m, d), pres in registros.items()]
     except Exception:
         return []
-    return result
+    _dat_cache[path] = (assinatura, result)
+    return list(result)
 
 
 # Funções para gerenciamento de turnos de turmas
@@ -288,6 +380,10 @@ def set_turno_turma(id_turma, turno):
     """Define o turno de uma turma (via servidor)"""
     return set_turno_server(id_turma, turno)
 
+def get_all_turnos():
+    """Retorna {id_turma: turno} de todas as turmas em uma única consulta (via servidor)"""
+    return get_all_turnos_server()
+
 # Funções para gerenciamento de notas de exame
 def load_exames():
     """Carrega as notas de exame"""
@@ -317,6 +413,16 @@ def get_nota_exame(matricula):
     """Retorna a nota de exame de um aluno (via servidor)"""
     return get_nota_exame_server(matricula)
 
+def load_all_notas_exame():
+    """Retorna {matricula: nota_exame} de todos os alunos em uma única consulta (via servidor)"""
+    exames = {}
+    for matricula, nota in get_all_exames_server().items():
+        try:
+            exames[str(matricula)] = float(nota)
+        except (TypeError, ValueError):
+            continue
+    return exames
+
 def set_nota_exame(matricula, nota):
     """Define a nota de exame de um aluno (via servidor)"""
     return set_nota_exame_server(matricula, nota)
@@ -350,6 +456,10 @@ def set_provas_turma(id_turma, np1=None, np2=None, pim=None, exame=None):
     """Define as datas de provas para uma turma (via servidor)"""
     return set_provas_turma_server(id_turma, np1, np2, pim, exame)
 
+def get_all_provas():
+    """Retorna {id_turma: datas} de todas as turmas em uma única consulta (via servidor)"""
+    return get_provas_server()
+
 
 def run_server():
     """Encapsula toda a lógica do servidor para ser executada em um processo."""
@@ -485,8 +595,21 @@ def run_server():
         print(f"[SERVIDOR] Nova conexão de {addr}")
         try:
             while True:
-                data = conn.recv(1024).decode('utf-8')
-                if not data: break
+                bruto = conn.recv(1024)
+                if not bruto: break
+                
+                # Requisição enquadrada (conexões reaproveitadas do pool do cliente):
+                # FRAME_MAGIC + tamanho (4 bytes) + comando; a resposta volta com o tamanho na frente
+                enquadrado = bruto.startswith(FRAME_MAGIC)
+                if enquadrado:
+                    bruto = bruto[len(FRAME_MAGIC):]
+                    if len(bruto) < 4:
+                        bruto += _recv_exato(conn, 4 - len(bruto))
+                    tamanho = struct.unpack('!I', bruto[:4])[0]
+                    bruto = bruto[4:]
+                    if len(bruto) < tamanho:
+                        bruto += _recv_exato(conn, tamanho - len(bruto))
+                data = bruto.decode('utf-8')
                 
                 parts = data.split('|'); command = parts[0]
                 response = "ERRO: Comando não reconhecido."
@@ -516,6 +639,57 @@ def run_server():
                             response = ""
                             for i in range(count): response += f"ID: {turmas[i].id}, Disciplina: {turmas[i].nome_disciplina.decode('utf-8')}, Prof: {turmas[i].nome_professor.decode('utf-8')}\n"
                 
+                elif command == "LIST_TURMAS_WITH_COUNTS":
+                    # Uma linha por turma: id|disciplina|professor|turno|total_alunos
+                    if not lib:
+                        response = "Nenhuma turma cadastrada."
+                    else:
+                        TurmasArray = Turma * 100; turmas = TurmasArray()
+                        count = lib.listar_turmas(turmas, 100)
+                        if count == 0:
+                            response = "Nenhuma turma cadastrada."
+                        else:
+                            # Reaproveita o mesmo buffer de alunos para contar todas as turmas
+                            AlunosArray = Aluno * 100; alunos = AlunosArray()
+                            with file_lock:
+                                turnos = dict(server_turnos)
+                            linhas = []
+                            for i in range(count):
+                                tid = turmas[i].id
+                                total = lib.listar_alunos_por_turma(tid, alunos, 100)
+                                linhas.append(
+                                    f"{tid}|{turmas[i].nome_disciplina.decode('utf-8')}|{turmas[i].nome_professor.decode('utf-8')}|"
+                                    f"{turnos.get(str(tid), 'matutino')}|{total}"
+                                )
+                            response = "\n".join(linhas) + "\n"
+                
+                elif command == "MAX_MATRICULA":
+                    # Maior matrícula cadastrada em qualquer turma (0 se não houver alunos)
+                    if not lib:
+                        response = "ERRO: Biblioteca C não carregada."
+                    else:
+                        TurmasArray = Turma * 100; turmas = TurmasArray()
+                        AlunosArray = Aluno * 100; alunos = AlunosArray()
+                        maior = 0
+                        for i in range(lib.listar_turmas(turmas, 100)):
+                            total = lib.listar_alunos_por_turma(turmas[i].id, alunos, 100)
+                            for j in range(total):
+                                maior = max(maior, alunos[j].matricula)
+                        response = str(maior)
+                
+                elif command == "LIST_ALL_ENROLLED_MATRICULAS":
+                    # Todas as matrículas com turma, uma por linha (vazio se não houver alunos)
+                    if not lib:
+                        response = "ERRO: Biblioteca C não carregada."
+                    else:
+                        TurmasArray = Turma * 100; turmas = TurmasArray()
+                        AlunosArray = Aluno * 100; alunos = AlunosArray()
+                        matriculas = []
+                        for i in range(lib.listar_turmas(turmas, 100)):
+                            total = lib.listar_alunos_por_turma(turmas[i].id, alunos, 100)
+                            matriculas.extend(str(alunos[j].matricula) for j in range(total))
+                        response = "\n".join(matriculas)
+                
                 elif command == "ADD_ALUNO":
                     with file_lock:
                         id_turma, matricula = int(parts[1]), int(parts[2])
@@ -613,6 +787,18 @@ def run_server():
                     else:
                         response = "ERRO: Aluno não encontrado."
 
+                elif command == "GET_TURMA_DO_ALUNO":
+                    # Resposta: id_turma|disciplina da turma em que a matrícula está cadastrada
+                    matricula = int(parts[1]); aluno_encontrado = Aluno(); turma_encontrada = Turma()
+                    if not lib:
+                        response = "ERRO: Biblioteca C não carregada."
+                    elif not lib.buscar_aluno_por_matricula(matricula, ctypes.byref(aluno_encontrado)):
+                        response = "ERRO: Aluno não encontrado."
+                    elif lib.buscar_turma_por_id(aluno_encontrado.id_turma, ctypes.byref(turma_encontrada)):
+                        response = f"{turma_encontrada.id}|{turma_encontrada.nome_disciplina.decode('utf-8')}"
+                    else:
+                        response = "ERRO: Turma não encontrada."
+
                 elif command == "UPDATE_ALUNO":
                     with file_lock:
                         if not lib:
@@ -712,6 +898,62 @@ def run_server():
                     except Exception as e:
                         response = f"ERRO: Formato inválido para UPDATE_NOTAS: {e}"
 
+                elif command == "UPDATE_NOTAS_BULK":
+                    # Client sends: UPDATE_NOTAS_BULK|id_turma|mat:np1:np2:pim:media;mat:np1:np2:pim:media;...
+                    try:
+                        id_turma = int(parts[1])
+                        lote = []
+                        for registro in parts[2].split(';'):
+                            if registro:
+                                campos = registro.split(':')
+                                lote.append((int(campos[0]), float(campos[1]), float(campos[2]), float(campos[3]), float(campos[4])))
+                        
+                        falhas = []
+                        if lib:
+                            # Só altera alunos da turma informada
+                            aluno = Aluno()
+                            validos = []
+                            for registro in lote:
+                                if lib.buscar_aluno_por_matricula(registro[0], ctypes.byref(aluno)) and aluno.id_turma == id_turma:
+                                    validos.append(registro)
+                                else:
+                                    falhas.append(str(registro[0]))
+                            lote = validos
+                        if lib and hasattr(lib, 'salvar_notas'):
+                            lib.salvar_notas.argtypes = [ctypes.c_int, ctypes.POINTER(Notas)]
+                            lib.salvar_notas.restype = ctypes.c_int
+                            for matricula, np1, np2, pim, media in lote:
+                                notas = Notas(np1=np1, np2=np2, pim=pim, media=media)
+                                if not lib.salvar_notas(matricula, ctypes.byref(notas)):
+                                    falhas.append(str(matricula))
+                        else:
+                            # Fallback: mesmo notas.dat do UPDATE_NOTAS, lido e gravado uma única vez
+                            notas_path = os.path.join(UPLOAD_FOLDER, 'notas.dat')
+                            rec_fmt = '<i4f'
+                            with file_lock:
+                                notas_db = {}
+                                try:
+                                    with open(notas_path, 'rb') as bf:
+                                        data = bf.read()
+                                    for m, a, b, c, d in struct.iter_unpack(rec_fmt, data):
+                                        notas_db[m] = (a, b, c, d)
+                                except (OSError, struct.error):
+                                    notas_db = {}
+                                for matricula, np1, np2, pim, media in lote:
+                                    notas_db[matricula] = (np1, np2, pim, media)
+                                tmp_path = notas_path + '.tmp'
+                                with open(tmp_path, 'wb') as bf:
+                                    for m, vals in notas_db.items():
+                                        bf.write(struct.pack(rec_fmt, m, *vals))
+                                os.replace(tmp_path, notas_path)
+                        
+                        if falhas:
+                            response = f"ERRO: Falha ao atualizar notas das matrículas: {', '.join(falhas)}"
+                        else:
+                            response = f"SUCESSO: Notas de {len(lote)} aluno(s) atualizadas."
+                    except Exception as e:
+                        response = f"ERRO: Formato inválido para UPDATE_NOTAS_BULK: {e}"
+
                 elif command == "UPLOAD_FILE":
                     id_turma, filename, filesize = parts[1], parts[2], int(parts[3])
                     turma_folder = os.path.join(UPLOAD_FOLDER, f"turma_{id_turma}"); os.makedirs(turma_folder, exist_ok=True)
@@ -723,6 +965,8 @@ def run_server():
                             chunk = conn.recv(4096)
                             if not chunk: break
                             f.write(chunk); bytes_received += len(chunk)
+                    # Gravar o conteúdo não muda o mtime da pasta: descartar a listagem em cache
+                    _pasta_cache.pop(turma_folder, None)
                     response = "SUCESSO: Arquivo recebido."
 
                 elif command == "LIST_FILES":
@@ -737,6 +981,17 @@ def run_server():
                         else:
                             response = "\n".join(files)
 
+                elif command == "LIST_FILES_V2":
+                    # Metadados de todas as atividades em uma única resposta JSON (um os.scandir)
+                    arquivos = listar_arquivos_pasta(os.path.join(UPLOAD_FOLDER, f"turma_{parts[1]}"))
+                    lista = []
+                    for original in sorted(arquivos):
+                        tamanho, mtime = arquivos[original]
+                        prefixo, _, nome = original.partition('_')
+                        lista.append({'name': nome if prefixo.isdigit() else original,
+                                      'size': tamanho, 'mtime': mtime, 'orig': original})
+                    response = json.dumps(lista, ensure_ascii=False)
+
                 elif command == "DOWNLOAD_FILE":
                     id_turma, filename = parts[1], parts[2]
                     filepath = os.path.join(UPLOAD_FOLDER, f"turma_{id_turma}", filename)
@@ -744,10 +999,11 @@ def run_server():
                         response = "ERRO: Arquivo não encontrado."
                     else:
                         filesize = os.path.getsize(filepath)
-                        conn.sendall(f"OK_DOWNLOAD|{filesize}".encode('utf-8'))
+                        # O \n marca o fim do cabeçalho: o cliente sabe onde o arquivo começa
+                        conn.sendall(f"OK_DOWNLOAD|{filesize}\n".encode('utf-8'))
                         with open(filepath, "rb") as f:
-                            while (chunk := f.read(4096)):
-                                conn.sendall(chunk)
+                            # sendfile(2) onde houver: o kernel copia do arquivo direto para o socket
+                            conn.sendfile(f)
                         return  # Skip sending additional response
                 
                 # Comandos de gerenciamento de usuários
@@ -772,7 +1028,6 @@ def run_server():
                     with file_lock:
                         user_data = user_db.get_user_data(username)
                         if user_data:
-                            import json
                             # Não enviar a senha
                             safe_data = {k: v for k, v in user_data.items() if k != 'password' and k != 'secret_answer'}
                             response = "SUCESSO|" + json.dumps(safe_data)
@@ -782,7 +1037,6 @@ def run_server():
                 elif command == "UPDATE_USER":
                     username = parts[1]
                     updates_json = parts[2] if len(parts) > 2 else "{}"
-                    import json
                     try:
                         updates = json.loads(updates_json)
                         with file_lock:
@@ -809,7 +1063,6 @@ def run_server():
                 
                 elif command == "LIST_USERS":
                     with file_lock:
-                        import json
                         safe_users = {}
                         for uname, udata in user_db.users.items():
                             safe_users[uname] = {k: v for k, v in udata.items() if k != 'password' and k != 'secret_answer'}
@@ -838,14 +1091,12 @@ def run_server():
                 # Comandos para gerenciamento de provas
                 elif command == "GET_PROVAS":
                     with file_lock:
-                        import json
                         response = json.dumps(server_provas, ensure_ascii=False)
                 
                 elif command == "GET_PROVAS_TURMA":
                     id_turma = str(parts[1])
                     with file_lock:
                         if id_turma in server_provas:
-                            import json
                             response = json.dumps(server_provas[id_turma], ensure_ascii=False)
                         else:
                             response = json.dumps({'NP1': None, 'NP2': None, 'PIM': None, 'Exame': None}, ensure_ascii=False)
@@ -878,6 +1129,10 @@ def run_server():
                     with file_lock:
                         response = server_turnos.get(id_turma, 'matutino')
                 
+                elif command == "GET_ALL_TURNOS":
+                    with file_lock:
+                        response = json.dumps(server_turnos, ensure_ascii=False)
+                
                 elif command == "SET_TURNO":
                     id_turma = str(parts[1])
                     turno = parts[2]
@@ -907,17 +1162,14 @@ def run_server():
                 
                 elif command == "GET_ALL_EXAMES":
                     with file_lock:
-                        import json
                         response = json.dumps(server_exames, ensure_ascii=False)
                 
                 # Comandos para gerenciamento de anotações
                 elif command == "GET_ANOTACOES":
                     with file_lock:
-                        import json
                         response = json.dumps(server_anotacoes, ensure_ascii=False)
                 
                 elif command == "ADD_ANOTACAO":
-                    import json
                     import datetime
                     anotacao_json = parts[1] if len(parts) > 1 else "{}"
                     try:
@@ -949,7 +1201,6 @@ def run_server():
                         response = f"ERRO: {str(e)}"
                 
                 elif command == "UPDATE_ANOTACAO":
-                    import json
                     titulo_antigo = parts[1] if len(parts) > 1 else ""
                     anotacao_json = parts[2] if len(parts) > 2 else "{}"
                     try:
@@ -978,7 +1229,11 @@ def run_server():
                         else:
                             response = "ERRO: Falha ao remover anotação"
 
-                conn.sendall(response.encode('utf-8'))
+                if enquadrado:
+                    payload = response.encode('utf-8')
+                    conn.sendall(struct.pack('!I', len(payload)) + payload)
+                else:
+                    conn.sendall(response.encode('utf-8'))
         except Exception as e:
             print(f"[SERVIDOR-ERRO] Erro com {addr}: {e}")
         finally:
@@ -992,21 +1247,260 @@ def run_server():
 
 HOST, PORT = '127.0.0.1', 65432
 #Alterar o host para o do servidor
+
+# Tempo (segundos) que respostas de leitura (LIST_/GET_) ficam em cache no cliente
+REQUEST_CACHE_TTL = 2.0
+# Validade maior para respostas pré-carregadas (ex.: alunos das turmas vizinhas no seletor)
+PREFETCH_CACHE_TTL = 30.0
+# Máximo de respostas mantidas no cache do cliente (as usadas há mais tempo saem primeiro)
+REQUEST_CACHE_MAX = 256
+# Validade da lista de turmas já montada (com turnos) compartilhada entre os diálogos
+TURMAS_CACHE_TTL = 30.0
+# Linhas inseridas por vez no display principal (o restante é agendado com after)
+DISPLAY_BATCH_SIZE = 40
+# Callbacks chamados quando um comando que altera dados é enviado (ex.: limpar caches do cliente)
+_invalidadores_cache = []
+
+def _notificar_comando(command):
+    """Invalida os caches registrados se o comando não for de leitura (LIST_/GET_)"""
+    if not command.startswith(('LIST_', 'GET_')):
+        for invalidar in _invalidadores_cache:
+            invalidar()
+
 # ==============================================================================
 # FUNÇÕES AUXILIARES PARA COMUNICAÇÃO COM O SERVIDOR VIA SOCKET
 # ==============================================================================
 
+# Marca de requisição enquadrada (nenhum comando de texto começa com byte nulo)
+FRAME_MAGIC = b'\x00'
+
+def _recv_exato(sock, n):
+    """Lê exatamente n bytes do socket (ConnectionError se a conexão fechar antes)"""
+    partes = []
+    while n > 0:
+        chunk = sock.recv(min(n, 65536))
+        if not chunk:
+            raise ConnectionError("Conexão encerrada pelo servidor")
+        partes.append(chunk)
+        n -= len(chunk)
+    return b"".join(partes)
+
+class _SocketPool:
+    """Conexões TCP ociosas com o servidor, reaproveitadas entre requisições.
+    Cada conexão leva uma requisição por vez, com tamanho explícito (FRAME_MAGIC),
+    então a resposta é lida por completo e o socket pode voltar ao pool."""
+    def __init__(self, max_ociosas=4):
+        self.max_ociosas = max_ociosas
+        self._ociosas = collections.deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Retorna (socket, reaproveitado)"""
+        with self._lock:
+            if self._ociosas:
+                return self._ociosas.pop(), True
+        s = socket.create_connection((HOST, PORT))
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # Requisições curtas de ida e volta: enviar sem esperar o algoritmo de Nagle
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return s, False
+
+    def release(self, s):
+        with self._lock:
+            if len(self._ociosas) < self.max_ociosas:
+                self._ociosas.append(s)
+                return
+        s.close()
+
+    def request(self, command):
+        """Envia o comando e retorna a resposta completa; erros de conexão são propagados"""
+        payload = command.encode('utf-8')
+        for tentativa in range(2):
+            s, reaproveitado = self.acquire()
+            try:
+                s.sendall(FRAME_MAGIC + struct.pack('!I', len(payload)) + payload)
+                tamanho = struct.unpack('!I', _recv_exato(s, 4))[0]
+                resposta = _recv_exato(s, tamanho)
+            except OSError:
+                s.close()
+                # Conexão ociosa pode ter sido fechada pelo servidor (ex.: reinício): tenta uma nova
+                if reaproveitado and tentativa == 0:
+                    continue
+                raise
+            self.release(s)
+            return resposta.decode('utf-8')
+
+_server_pool = _SocketPool()
+
 def send_server_command(command, buffer=8192):
-    """Envia um comando ao servidor e retorna a resposta"""
+    """Envia um comando ao servidor e retorna a resposta.
+    `buffer` é mantido por compatibilidade: a resposta enquadrada é lida por completo."""
+    _notificar_comando(command)
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.connect((HOST, PORT))
-            s.sendall(command.encode('utf-8'))
-            return s.recv(buffer).decode('utf-8')
+        return _server_pool.request(command)
     except Exception as e:
         print(f"[CLIENTE-ERRO] Erro ao conectar ao servidor: {e}")
         return None
 
+def enviar_arquivo_servidor(id_turma, f_path):
+    """Envia um arquivo de atividade (UPLOAD_FILE) em conexão própria e retorna a
+    resposta final do servidor, ou None se ele recusar o envio. Não usa widgets,
+    então pode rodar fora da thread do Tk; erros de rede/arquivo são propagados."""
+    f_size = os.path.getsize(f_path); f_name = os.path.basename(f_path)
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.connect((HOST, PORT)); s.sendall(f"UPLOAD_FILE|{id_turma}|{f_name}|{f_size}".encode('utf-8'))
+        if s.recv(1024) != b"OK_SEND_DATA":
+            return None
+        with open(f_path, "rb") as f:
+            if hasattr(os, 'sendfile'):
+                # sendfile(2): cópia direta do arquivo para o socket pelo kernel
+                s.sendfile(f)
+            else:
+                # Sem sendfile (ex.: Windows): um único buffer de 1 MiB reaproveitado
+                # em todo o envio, em vez de um bytes novo a cada bloco lido
+                buf = bytearray(1 << 20); mv = memoryview(buf)
+                while (n := f.readinto(buf)):
+                    s.sendall(mv[:n])
+        resp = s.recv(1024).decode('utf-8')
+    # Upload não passa por send_server_command: avisar os caches (ex.: LIST_FILES_V2) por aqui,
+    # depois da confirmação, para uma listagem feita durante o envio não ficar em cache sem o arquivo
+    _notificar_comando("UPLOAD_FILE")
+    return resp
+
+def baixar_arquivo_servidor(id_turma, arquivo, save_path):
+    """Baixa um arquivo de atividade (DOWNLOAD_FILE) para `save_path` em conexão própria.
+    Retorna None se o download foi feito, ou a mensagem de erro do servidor.
+    Não usa widgets; erros de rede/arquivo são propagados."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        # Buffer de recepção maior (antes do connect, para valer na escala de janela do TCP)
+        # e o pedido enviado sem esperar o algoritmo de Nagle. Opcional: se o sistema
+        # recusar, o download segue com os valores padrão.
+        try:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
+        s.connect((HOST, PORT))
+        s.sendall(f"DOWNLOAD_FILE|{id_turma}|{arquivo}".encode('utf-8'))
+        # Cabeçalho "OK_DOWNLOAD|<tamanho>\n"; o que chegar depois do \n já é o arquivo
+        inicio = s.recv(1024)
+        if not inicio.startswith(b"OK_DOWNLOAD"):
+            return inicio.decode('utf-8', errors='ignore') or "ERRO: Resposta vazia do servidor."
+        while b"\n" not in inicio:
+            mais = s.recv(1024)
+            if not mais:
+                raise ConnectionError("Conexão encerrada pelo servidor")
+            inicio += mais
+        cabecalho, _, restante = inicio.partition(b"\n")
+        filesize = int(cabecalho.split(b"|")[1])
+        
+        # Um buffer de 1 MiB reaproveitado (recv_into), em vez de um bytes novo a cada 4 KiB
+        buf = bytearray(1 << 20); mv = memoryview(buf)
+        with open(save_path, "wb") as f:
+            restante = restante[:filesize]
+            f.write(restante)
+            bytes_received = len(restante)
+            while bytes_received < filesize:
+                n = s.recv_into(mv[:min(len(buf), filesize - bytes_received)])
+                if not n: break
+                f.write(mv[:n])
+                bytes_received += n
+    if bytes_received < filesize:
+        # Conexão encerrada antes do fim: não deixar um arquivo truncado no disco
+        try:
+            os.remove(save_path)
+        except OSError:
+            pass
+        raise ConnectionError(f"Download incompleto: {bytes_received} de {filesize} bytes recebidos")
+    return None
+
+def _campos_linha(linha):
+    """Converte 'Campo: valor, Campo: valor' em {'Campo': 'valor', ...}"""
+    campos = {}
+    for parte in linha.split(', '):
+        nome, _, valor = parte.partition(': ')
+        campos[nome] = valor
+    return campos
+
+def parse_turmas_response(resp):
+    """Converte a resposta de LIST_TURMAS em uma tupla de dicts
+    {'id', 'disciplina', 'professor'}. Tupla vazia se não houver turmas."""
+    if not resp or "Nenhuma turma" in resp:
+        return ()
+    turmas = []
+    for linha in resp.strip().split('\n'):
+        if not linha:
+            continue
+        campos = _campos_linha(linha)
+        if not campos.get('ID'):
+            continue
+        turmas.append({
+            'id': campos['ID'],
+            'disciplina': campos.get('Disciplina', ''),
+            'professor': campos.get('Prof', '')
+        })
+    return tuple(turmas)
+
+def parse_arquivos_response(resp):
+    """Converte a resposta de LIST_FILES_V2 em uma tupla de dicts {'name', 'size', 'mtime', 'orig'}.
+    Também aceita o formato antigo de LIST_FILES (um nome por linha, 'timestamp_nome.ext'),
+    caso em que o tamanho é None e a data vem do timestamp do nome."""
+    if not resp or resp.startswith("ERRO") or "Nenhuma atividade" in resp:
+        return ()
+    if resp.startswith('['):
+        try:
+            return tuple(json.loads(resp))
+        except ValueError:
+            return ()
+    arquivos = []
+    for arquivo in resp.strip().split('\n'):
+        if not arquivo:
+            continue
+        prefixo, _, nome = arquivo.partition('_')
+        if prefixo.isdigit():
+            arquivos.append({'name': nome, 'size': None, 'mtime': int(prefixo), 'orig': arquivo})
+        else:
+            arquivos.append({'name': arquivo, 'size': None, 'mtime': None, 'orig': arquivo})
+    return tuple(arquivos)
+
+def parse_alunos_response(resp):
+    """Converte a resposta de LIST_ALUNOS_POR_TURMA em uma tupla de dicts
+    {'matricula', 'nome', 'np1', 'np2', 'pim', 'media', 'exame'}."""
+    if not resp or "Nenhum aluno" in resp:
+        return ()
+    alunos = []
+    for m in _ALUNO_LINE_RE.finditer(resp):
+        aluno = {'matricula': m['mat'], 'nome': m['nome']}
+        for chave in ('np1', 'np2', 'pim', 'media', 'exame'):
+            try:
+                aluno[chave] = float(m[chave] or 0.0)
+            except ValueError:
+                aluno[chave] = 0.0
+        alunos.append(aluno)
+    return tuple(alunos)
+
+def _classificar(tem_notas, aprovado_media, exame_vazio, aprovado_exame):
+    """Regra de aprovação: (status, tag de cor) a partir das condições já avaliadas"""
+    if not tem_notas:
+        return "Pendente Atribuir Notas", 'reprovado'
+    if aprovado_media:
+        return "Aprovado", 'aprovado'
+    if exame_vazio:
+        return "Pendente Exame", 'reprovado'
+    if aprovado_exame:
+        return "Aprovado (Exame)", 'aprovado'
+    return "Reprovado", 'reprovado'
+
+# Todas as 16 combinações pré-calculadas: (tem_notas, média >= 7, exame == 0, exame >= 5) -> (status, tag)
+_STATUS_MAP = {
+    chave: _classificar(*chave)
+    for chave in itertools.product((False, True), repeat=4)
+}
+
+def status_aluno(np1, np2, pim, media, exame):
+    """Retorna (status, tag de cor) do aluno conforme as notas e o exame"""
+    return _STATUS_MAP[(np1 > 0 or np2 > 0 or pim > 0, media >= 7.0, exame == 0.0, exame >= 5.0)]
+
 # Funções auxiliares para operações de provas, turnos, exames e anotações via servidor
 def get_provas_server():
     """Obtém todas as provas do servidor"""
@@ -1060,6 +1554,16 @@ def get_turno_server(id_turma):
         return response
     return 'matutino'
 
+def get_all_turnos_server():
+    """Obtém o turno de todas as turmas"""
+    response = send_server_command("GET_ALL_TURNOS")
+    if response:
+        try:
+            return json.loads(response)
+        except Exception:
+            return {}
+    return {}
+
 def set_turno_server(id_turma, turno):
     """Define o turno de uma turma"""
     response = send_server_command(f"SET_TURNO|{id_turma}|{turno}")
@@ -1363,19 +1867,34 @@ def ask_yesno(parent, title, message):
 # FUNÇÕES AUXILIARES PARA CONFIGURAÇÃO DE JANELAS
 # ==============================================================================
 
+@functools.lru_cache(maxsize=None)
+def _make_circle_mask(tamanho):
+    """Máscara circular ('L') usada para recortar fotos de perfil.
+    Criada uma única vez por tamanho no processo; nunca é alterada."""
+    from PIL import Image, ImageDraw
+    mask = Image.new('L', (tamanho, tamanho), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, tamanho, tamanho), fill=255)
+    return mask
+
+# O ícone é carregado uma única vez: 'padrao' = já vale para todas as janelas, 'falhou' = indisponível
+_icone_estado = {'padrao': False, 'falhou': False}
+
 def _set_window_icon(win):
     """
     Define o ícone da aplicação para uma janela
     Usa icone.ico para Windows (melhor compatibilidade)
+    Na primeira chamada o ícone vira o padrão de todas as janelas (iconbitmap default=),
+    então as seguintes não precisam ler o arquivo de novo.
     """
     try:
-        if win is None: return
+        if win is None or _icone_estado['padrao'] or _icone_estado['falhou']: return
         # Preferir .ico para Windows
         try:
-            win.iconbitmap("img/icone.ico")
+            win.iconbitmap(default="img/icone.ico")
+            _icone_estado['padrao'] = True
         except Exception:
-            # Melhor esforço para outros formatos ou plataformas (ignora falhas)
-            pass
+            # Melhor esforço para outros formatos ou plataformas (não tenta de novo)
+            _icone_estado['falhou'] = True
     except Exception:
         pass
 
@@ -1538,7 +2057,11 @@ def _apply_popup_theme(win, colors, fonts, style_obj=None):
     # Try to nudge ttk styles for popup widgets
     # NÃO sobrescrever estilos globais - apenas configurar estilos específicos de popup se necessário
     try:
-        if style_obj:
+        # Os estilos são compartilhados por todos os popups: só reconfigurar quando as cores mudarem
+        # (ex.: ao alternar o modo escuro), e não a cada dialog aberto
+        cores_popup = (colors.get('card'), colors.get('border'), colors.get('text'), colors.get('primary'))
+        if style_obj and getattr(style_obj, '_cores_popup', None) != cores_popup:
+            style_obj._cores_popup = cores_popup
             # Apenas garantir que TNotebook e TNotebook.Tab estejam bem configurados para popups
             # Mas NÃO sobrescrever TLabel, TFrame, etc que afetam a aplicação toda
             style_obj.configure('TNotebook', background=colors.get('card'), bordercolor=colors.get('border'))
@@ -1622,6 +2145,31 @@ class UserDatabase:
         self.filename = "users.json"
         self.legacy_filename = "users.dat"
         self.users = self.load_users()
+        self._reindex_matriculas()
+
+    def _reindex_matriculas(self):
+        """Reconstrói o índice matrícula -> username dos alunos e a lista ordenada de usernames."""
+        self._usernames = tuple(sorted(self.users))
+        indice = {}
+        for username, data in self.users.items():
+            if data.get('role') != 'aluno':
+                continue
+            try:
+                indice[int(data.get('matricula'))] = username
+            except (TypeError, ValueError):
+                continue
+        self._mat_index = indice
+
+    def get_username_by_matricula(self, matricula):
+        """Retorna o username do aluno com a matrícula informada (ou None)"""
+        try:
+            return self._mat_index.get(int(matricula))
+        except (TypeError, ValueError):
+            return None
+
+    def usernames_exceto(self, username):
+        """Retorna (em ordem alfabética) os usernames cadastrados, exceto o informado"""
+        return tuple(u for u in self._usernames if u != username)
 
     # Password hashing helpers (PBKDF2-HMAC-SHA256)
     def _hash_password(self, password: str, iterations: int = 200000):
@@ -1700,6 +2248,9 @@ class UserDatabase:
         import json
         if users is None:
             users = self.users
+        # Toda mutação de usuários passa por aqui: manter o índice sincronizado
+        if users is getattr(self, 'users', None):
+            self._reindex_matriculas()
         # Write JSON atomically
         tmp = self.filename + '.tmp'
         try:
@@ -1942,32 +2493,32 @@ class UserDatabase:
     def can_access_subject(self, username, subject_id):
         """Verifica se um professor pode acessar uma matéria específica"""
         if username not in self.users:
-            print(f"[DEBUG] Usuário '{username}' não encontrado")
             return False
         
         user_role = self.users[username]['role']
         
         if user_role == 'admin':
-            print(f"[DEBUG] Admin '{username}' tem acesso total")
             return True  # Admin pode acessar tudo
         
         if user_role == 'aluno':
-            print(f"[DEBUG] Aluno '{username}' - verificação de acesso não aplicável")
-            return False
+            return False  # Verificação de acesso não aplicável a alunos
         
         if user_role != 'professor':
-            print(f"[DEBUG] Usuário '{username}' com role '{user_role}' não tem acesso")
             return False
         
         subjects = self.users[username].get('subjects', [])
         # Converter subject_id para string para comparação consistente
         subject_id_str = str(subject_id)
-        # Verificar se está na lista (pode estar como string ou int)
-        has_access = subject_id_str in [str(s) for s in subjects]
-        
-        print(f"[DEBUG] Professor '{username}' - Turma '{subject_id}' - Matérias atribuídas: {subjects} - Acesso: {has_access}")
-        
-        return has_access
+        # Verificar se está na lista (pode estar como string ou int), parando no primeiro encontrado
+        return any(str(s) == subject_id_str for s in subjects)
+    
+    def get_accessible_subject_ids(self, username):
+        """Retorna o conjunto (como strings) das matérias que um professor pode acessar.
+        Equivale a chamar can_access_subject para cada turma, mas em uma única passada."""
+        user = self.users.get(username)
+        if not user or user.get('role') != 'professor':
+            return set()
+        return {str(s) for s in user.get('subjects', [])}
     
     def get_all_professors(self):
         """Retorna lista de todos os professores"""
@@ -2002,7 +2553,8 @@ class UserDatabase:
         return self.users[username].get('matricula')
     
     def get_pending_users(self):
-        """Retorna lista de usuários pendentes de aprovação"""
+        """Retorna lista de usuários pendentes de aprovação, já com os dados
+        exibidos na aprovação (matrícula e turno), em uma única passada"""
         pending = []
         for username, data in self.users.items():
             if data.get('status') == 'pending':
@@ -2010,7 +2562,9 @@ class UserDatabase:
                     'username': username,
                     'email': data.get('email', ''),
                     'role': data.get('role', ''),
-                    'created_at': data.get('created_at', None)
+                    'created_at': data.get('created_at', None),
+                    'matricula': data.get('matricula'),
+                    'turno': data.get('turno', 'Não definido')
                 })
         return pending
     
@@ -2074,6 +2628,12 @@ class UserDatabase:
         self.save_users()
         return True, "Usuário atualizado com sucesso"
 
+@functools.lru_cache(maxsize=64)
+def _semanas_do_mes(ano, mes):
+    """Grade do mês (semanas de Segunda a Domingo, 0 = dia de outro mês), como
+    calendar.monthcalendar; guardada por (ano, mes) para a navegação entre meses."""
+    return tuple(tuple(semana) for semana in calendar.monthcalendar(ano, mes))
+
 def show_calendar_picker(parent, entry_widget, colors):
     """Exibe um calendário visual para seleção de data"""
     cal_dialog = tk.Toplevel(parent)
@@ -2134,7 +2694,7 @@ def show_calendar_picker(parent, entry_widget, colors):
                     width=4).grid(row=1, column=i, padx=2, pady=2)
         
         # Obter calendário do mês
-        cal = calendar.monthcalendar(year, month)
+        cal = _semanas_do_mes(year, month)
         
         def select_date(day):
             nonlocal selected_date
@@ -3216,9 +3776,32 @@ class App(tk.Tk):
         except Exception:
             pass
         
+        # Cache de respostas do servidor: comando -> (timestamp, resposta), em ordem de uso
+        self._req_cache = collections.OrderedDict()
+        # Lista de turmas já montada por _get_turmas_list: filtrar_turno -> (timestamp, turmas)
+        self._turmas_cache = {}
+        # Incrementada a cada invalidação: leituras iniciadas antes dela não voltam para o cache
+        self._cache_geracao = 0
+        # Mutações enviadas por send_server_command (SET_TURNO, SET_EXAME...) também limpam o cache
+        _invalidadores_cache.append(self._invalidar_cache)
+        _invalidadores_cache.append(self._turmas_cache.clear)
+        # Threads para E/S de rede, evitando travar a interface durante as consultas
+        self._io_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        # Uploads/downloads de arquivos ficam em threads próprias: transferências longas
+        # não ocupam o _io_pool usado pelas consultas (algumas aguardadas na thread do Tk)
+        self._transfer_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        # Respostas já convertidas em registros: comando -> (resposta, registros)
+        self._parsed_cache = {}
+        # Leituras assíncronas em andamento: comando -> [(callback, mostrar_erro), ...]
+        self._inflight = {}
+        # Fotos de perfil já recortadas: (caminho, mtime, tamanho) -> PhotoImage
+        self._photo_cache = {}
+        
         self._setup_theme() # <-- MUDANÇA: Centraliza a configuração de estilo
         # Initialize sorting state early (used by _update_display before widgets may be created)
         self._sort_state = {}
+        # Inserção em lotes pendente no display principal (after id)
+        self._display_job = None
         # Apply theme according to dark_mode flag
         try:
             self._apply_app_theme()
@@ -4211,13 +4794,167 @@ class App(tk.Tk):
             messagebox.showinfo("Perfil do Usuário", info)
             
     def _send_request(self, request, buffer=8192):
+        # Qualquer comando que não seja de leitura pode alterar dados: invalidar o cache
+        _notificar_comando(request)
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.connect((HOST, PORT)); s.sendall(request.encode('utf-8')); return s.recv(buffer).decode('utf-8')
+            # Conexão reaproveitada do pool (resposta lida por completo, sem limite de buffer)
+            return _server_pool.request(request)
         except Exception as e: messagebox.showerror("Erro de Conexão", f"Não foi possível conectar ao servidor: {e}"); return None
 
-    def _update_display(self, title, headers, data):
-        """Atualiza o display com novos dados"""
+    def _send_request_cached(self, request, ttl=REQUEST_CACHE_TTL, buffer=8192):
+        """Igual a _send_request, mas reaproveita a resposta do mesmo comando por até `ttl` segundos.
+        Usar apenas para comandos de leitura (LIST_/GET_)."""
+        agora = time.monotonic()
+        entrada = self._req_cache.get(request)
+        if entrada and agora - entrada[0] < ttl:
+            self._marcar_uso(request)
+            return entrada[1]
+        geracao = self._cache_geracao
+        resp = self._send_request(request, buffer)
+        if resp is not None:
+            self._guardar_resposta(request, agora, resp, geracao)
+        return resp
+
+    def _invalidar_cache(self):
+        """Limpa o _req_cache após uma mutação. Respostas de leituras ainda em andamento
+        são descartadas (não voltam ao cache) e não recebem novos interessados."""
+        self._cache_geracao += 1
+        self._req_cache.clear()
+        self._inflight.clear()
+
+    def _guardar_resposta(self, request, instante, resp, geracao):
+        """Guarda a resposta no _req_cache, descartando as menos usadas acima de REQUEST_CACHE_MAX.
+        Ignora a resposta se o cache foi invalidado depois que a leitura começou (`geracao`)."""
+        if geracao != self._cache_geracao:
+            return
+        self._req_cache.pop(request, None)  # reinserir no fim da ordem de uso
+        self._req_cache[request] = (instante, resp)
+        try:
+            while len(self._req_cache) > REQUEST_CACHE_MAX:
+                antigo, _ = self._req_cache.popitem(last=False)
+                self._parsed_cache.pop(antigo, None)
+        except KeyError:
+            pass  # Cache limpo por uma mutação enviada de outra thread
+
+    def _marcar_uso(self, request):
+        """Move a entrada para o fim da ordem de uso (a última a ser descartada)"""
+        try:
+            self._req_cache.move_to_end(request)
+        except KeyError:
+            pass  # Cache limpo por uma mutação enviada de outra thread
+
+    def _foto_perfil_redonda(self, caminho, tamanho=60):
+        """Retorna a foto de perfil recortada em círculo como PhotoImage.
+        Fica em cache por caminho/data de modificação, então trocar a foto gera uma nova imagem."""
+        chave = (caminho, os.path.getmtime(caminho), tamanho)
+        photo = self._photo_cache.get(chave)
+        if photo is not None:
+            return photo
+        
+        from PIL import Image, ImageTk
+        
+        with Image.open(caminho) as img:
+            # Fotos grandes (ex.: 4000x3000 de celular): o JPEG já é decodificado em escala
+            # reduzida e o reducing_gap reduz por fator inteiro antes do filtro LANCZOS
+            img.draft('RGB', (tamanho * 4, tamanho * 4))
+            img = img.resize((tamanho, tamanho), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        
+        # Aplicar máscara
+        output = Image.new('RGBA', (tamanho, tamanho), (0, 0, 0, 0))
+        output.paste(img, (0, 0))
+        output.putalpha(_make_circle_mask(tamanho))
+        
+        photo = ImageTk.PhotoImage(output)
+        self._photo_cache[chave] = photo
+        return photo
+
+    def _make_placeholder(self, alvo, tamanho_fonte=40, width=3, height=1):
+        """Placeholder "👤" para usuários sem foto. Se `alvo` já for um Label ele é
+        reconfigurado; caso contrário um novo Label é criado dentro de `alvo`."""
+        opcoes = dict(text="👤", font=('Arial', tamanho_fonte),
+                      bg=self.colors['border'], fg=self.colors['text_secondary'],
+                      width=width, height=height)
+        if isinstance(alvo, tk.Label):
+            alvo.configure(**opcoes)
+            return alvo
+        return tk.Label(alvo, **opcoes)
+
+    def _send_request_parsed(self, request, parser, ttl=REQUEST_CACHE_TTL):
+        """Envia o comando (com cache) e devolve a resposta convertida por `parser`.
+        Enquanto a resposta em cache for a mesma, a conversão não é refeita."""
+        resp = self._send_request_cached(request, ttl)
+        if resp is None:
+            return ()
+        anterior = self._parsed_cache.get(request)
+        if anterior and anterior[0] is resp:
+            return anterior[1]
+        registros = parser(resp)
+        self._parsed_cache[request] = (resp, registros)
+        return registros
+
+    def _send_request_async(self, request, callback, cached=False, buffer=8192, mostrar_erro=True,
+                            ttl=REQUEST_CACHE_TTL):
+        """Envia o comando em uma thread do _io_pool e entrega a resposta a `callback`
+        na thread do Tk (via after). Com cached=True usa e alimenta o _req_cache.
+        Leituras (LIST_/GET_) iguais já em andamento são agrupadas em um único envio."""
+        inicio = time.monotonic()
+        if cached:
+            entrada = self._req_cache.get(request)
+            if entrada and inicio - entrada[0] < ttl:
+                self._marcar_uso(request)
+                callback(entrada[1])
+                return
+
+        geracao = self._cache_geracao
+        leitura = request.startswith(('LIST_', 'GET_'))
+        if leitura:
+            pendentes = self._inflight.get(request)
+            if pendentes is not None:
+                pendentes.append((callback, mostrar_erro))
+                return
+            self._inflight[request] = pendentes = [(callback, mostrar_erro)]
+        else:
+            pendentes = [(callback, mostrar_erro)]
+
+        def entregar(resp):
+            # Executa na thread do Tk: pode mexer em widgets e no cache
+            # Após uma invalidação a entrada pode já ser de uma leitura mais nova
+            if leitura and self._inflight.get(request) is pendentes:
+                del self._inflight[request]
+            if resp is None:
+                if any(erro for _, erro in pendentes):
+                    messagebox.showerror("Erro de Conexão", "Não foi possível conectar ao servidor.")
+            elif cached:
+                self._guardar_resposta(request, inicio, resp, geracao)
+            for cb, _ in pendentes:
+                cb(resp)
+
+        def concluido(fut):
+            try:
+                resp = fut.result()
+            except Exception:
+                resp = None
+            try:
+                self.after(0, entregar, resp)
+            except Exception:
+                pass  # Janela principal já foi fechada
+
+        # send_server_command não abre messagebox, então é seguro fora da thread do Tk
+        self._io_pool.submit(send_server_command, request, buffer).add_done_callback(concluido)
+
+    def destroy(self):
+        self._io_pool.shutdown(wait=False)
+        self._transfer_pool.shutdown(wait=False)
+        for invalidar in (self._invalidar_cache, self._turmas_cache.clear):
+            try:
+                _invalidadores_cache.remove(invalidar)
+            except ValueError:
+                pass
+        super().destroy()
+
+    def _update_display(self, title, headers, data, iids=None):
+        """Atualiza o display com novos dados. `iids`, se informado, dá o identificador
+        de cada linha na árvore (na mesma ordem de `data`)."""
         try:
             # Atualiza o cabeçalho se existir
             if hasattr(self, 'header_label'):
@@ -4228,6 +4965,11 @@ class App(tk.Tk):
                 messagebox.showerror("Erro", "Erro na inicialização da visualização")
                 return
 
+            # Cancela a inserção em lotes de uma listagem anterior ainda em andamento
+            if self._display_job is not None:
+                self.after_cancel(self._display_job)
+                self._display_job = None
+            
             # Limpa a árvore existente
             for item in self.display_tree.get_children():
                 self.display_tree.delete(item)
@@ -4247,31 +4989,38 @@ class App(tk.Tk):
                                           command=lambda _col=col: self._sort_by(_col, False))
                 self.display_tree.column(col, anchor=tk.CENTER, minwidth=100)
             
-            # Insere os dados com cores alternadas e status coloring when present
-            for i, row in enumerate(data):
-                tags = ('even' if i % 2 == 0 else 'odd',)
-                # If there's a Status column, apply color tag
-                if len(row) > 0 and headers and headers[-1] == 'Status':
-                    status = str(row[-1]).lower()
-                    if 'aprov' in status:
-                        tags = tags + ('aprovado',)
-                    elif 'reprov' in status:
-                        tags = tags + ('reprovado',)
-                self.display_tree.insert("", tk.END, values=row, tags=tags)
-            
-            # Ajusta o tamanho das colunas automaticamente
-            if data:
-                font = tkFont.Font()
-                for col in headers:
-                    max_width = font.measure(col) + 20
-                    col_idx = headers.index(col)
+            # Insere os dados em lotes: o primeiro lote aparece na hora e os demais são
+            # agendados com after, mantendo a interface responsiva em listas grandes
+            data = list(data)  # aceita qualquer iterável (ex.: gerador de linhas)
+            tem_status = bool(headers) and headers[-1] == 'Status'
+            font = tkFont.Font()
+            larguras = [font.measure(col) + 20 for col in headers]
+            
+            def inserir_lote(inicio):
+                self._display_job = None
+                lote = data[inicio:inicio + DISPLAY_BATCH_SIZE]
+                for i, row in enumerate(lote, inicio):
+                    tags = ('even' if i % 2 == 0 else 'odd',)
+                    # If there's a Status column, apply color tag
+                    if len(row) > 0 and tem_status:
+                        status = str(row[-1]).lower()
+                        if 'aprov' in status:
+                            tags = tags + ('aprovado',)
+                        elif 'reprov' in status:
+                            tags = tags + ('reprovado',)
+                    self.display_tree.insert("", tk.END, iid=iids[i] if iids else None, values=row, tags=tags)
                     
-                    for row in data:
-                        if col_idx < len(row):
-                            cell_width = font.measure(str(row[col_idx])) + 20
-                            max_width = max(max_width, cell_width)
-                    
-                    self.display_tree.column(col, width=min(max_width, 300))
+                    # Ajusta o tamanho das colunas conforme as linhas chegam
+                    for col_idx in range(min(len(row), len(larguras))):
+                        larguras[col_idx] = max(larguras[col_idx], font.measure(str(row[col_idx])) + 20)
+                
+                if lote:
+                    for col, largura in zip(headers, larguras):
+                        self.display_tree.column(col, width=min(largura, 300))
+                if inicio + DISPLAY_BATCH_SIZE < len(data):
+                    self._display_job = self.after(1, inserir_lote, inicio + DISPLAY_BATCH_SIZE)
+            
+            inserir_lote(0)
 
         except Exception as e:
             print(f"Erro ao atualizar display: {e}")
@@ -4346,11 +5095,8 @@ class App(tk.Tk):
         
         if ids_existentes:
             # Retornar o maior ID + 1
-            proximo_id = max(ids_existentes) + 1
-            print(f"Debug: IDs existentes: {sorted(ids_existentes)}, Próximo ID: {proximo_id}")
-            return proximo_id
+            return max(ids_existentes) + 1
         else:
-            print("Debug: Nenhum ID existente encontrado, iniciando em 1")
             return 1
     
     def cadastrar_turma(self):
@@ -4495,54 +5241,55 @@ class App(tk.Tk):
     
     def _get_turmas_list(self, filtrar_turno=True):
         """Return a list of dicts with turma info for existing turmas by querying the server.
-        Se filtrar_turno=True, filtra por turno do usuário (exceto admin)."""
-        resp = self._send_request("LIST_TURMAS")
+        Se filtrar_turno=True, filtra por turno do usuário (exceto admin).
+        A lista montada é reaproveitada por TURMAS_CACHE_TTL segundos (limpa em qualquer mutação)."""
+        agora = time.monotonic()
+        entrada = self._turmas_cache.get(filtrar_turno)
+        if entrada and agora - entrada[0] < TURMAS_CACHE_TTL:
+            return list(entrada[1])
+        registros = self._send_request_parsed("LIST_TURMAS", parse_turmas_response)
         turmas = []
-        if not resp or "Nenhuma turma" in resp:
+        if not registros:
             return turmas
         
         turno_usuario = self.db.users.get(self.username, {}).get('turno', 'matutino')
+        # Turnos de todas as turmas em uma única consulta
+        turnos = get_all_turnos()
         
-        for linha in resp.strip().split('\n'):
-            if not linha: continue
-            partes = linha.split(', ')
-            try:
-                id_turma = partes[0].split(': ')[1]
-                disciplina = partes[1].split(': ')[1] if len(partes) > 1 else ''
-                professor = partes[2].split(': ')[1] if len(partes) > 2 else ''
-                
-                # Buscar turno da turma
-                turno_turma = get_turno_turma(id_turma)
-                
-                # Filtrar por turno se não for admin e filtro ativo
-                if filtrar_turno and self.role != 'admin':
-                    if turno_turma != turno_usuario:
-                        continue  # Pula turmas de outros turnos
-                
-                # Return both tuple for backward compatibility and dict for new features
-                turmas.append({
-                    'id': id_turma,
-                    'nome_disciplina': disciplina,
-                    'nome_professor': professor,
-                    'turno': turno_turma,
-                    'tuple': (id_turma, f"{id_turma} - {disciplina} ({turno_turma.title()})")
-                })
-            except Exception:
-                continue
-        return turmas
+        for r in registros:
+            id_turma, disciplina = r['id'], r['disciplina']
+            
+            # Buscar turno da turma
+            turno_turma = turnos.get(id_turma, 'matutino')
+            
+            # Filtrar por turno se não for admin e filtro ativo
+            if filtrar_turno and self.role != 'admin':
+                if turno_turma != turno_usuario:
+                    continue  # Pula turmas de outros turnos
+            
+            # Return both tuple for backward compatibility and dict for new features
+            turmas.append({
+                'id': id_turma,
+                'nome_disciplina': disciplina,
+                'nome_professor': r['professor'],
+                'turno': turno_turma,
+                'label': f"{id_turma} - {disciplina}",
+                'tuple': (id_turma, f"{id_turma} - {disciplina} ({turno_turma.title()})")
+            })
+        self._turmas_cache[filtrar_turno] = (agora, turmas)
+        return list(turmas)
 
     def _ask_turma_dropdown(self, title="Selecionar Turma"):
-        """Show a small dialog with a Combobox listing turmas and return the selected id or None."""
+        """Show a small dialog with a Combobox listing turmas and return the selected id or None.
+        Para professores, apenas turmas liberadas (get_accessible_subject_ids) são oferecidas,
+        então o ID retornado já está validado."""
         turmas = self._get_turmas_list()
         
         # Filtrar turmas baseado no acesso do usuário
         if self.role == 'professor':
             # Professor só vê turmas que tem acesso
-            turmas_acessiveis = []
-            for t in turmas:
-                if self.db.can_access_subject(self.username, t['id']):
-                    turmas_acessiveis.append(t)
-            turmas = turmas_acessiveis
+            acessiveis = self.db.get_accessible_subject_ids(self.username)
+            turmas = [t for t in turmas if str(t['id']) in acessiveis]
         
         if not turmas:
             if self.role == 'professor':
@@ -4561,7 +5308,9 @@ class App(tk.Tk):
         dlg.transient(self); dlg.grab_set()
         _center_window(dlg)
         ttk.Label(dlg, text="Selecione a Turma:").pack(padx=10, pady=(10, 4))
-        combo = ttk.Combobox(dlg, values=[t['tuple'][1] for t in turmas], state='readonly')
+        # Rótulo do combobox -> id da turma
+        label_to_id = {t['tuple'][1]: t['id'] for t in turmas}
+        combo = ttk.Combobox(dlg, values=list(label_to_id), state='readonly')
         combo.pack(fill=tk.X, padx=10)
         # Preselect last turma if present
         initial_index = 0
@@ -4572,11 +5321,7 @@ class App(tk.Tk):
         combo.current(initial_index)
         result = {'value': None}
         def ok():
-            sel = combo.get()
-            for t in turmas:
-                if t['tuple'][1] == sel:
-                    result['value'] = t['id']
-                    break
+            result['value'] = label_to_id.get(combo.get())
             # persist last selected turma
             try:
                 self._last_turma = result['value']
@@ -4598,46 +5343,28 @@ class App(tk.Tk):
         self.wait_window(dlg)
         return result['value']
 
-    def _get_alunos_list(self, id_turma=None):
+    def _get_alunos_list(self, id_turma=None, ttl=REQUEST_CACHE_TTL):
         """Return a list of tuples (matricula, label) for alunos.
         If id_turma is provided, list only that turma; otherwise aggregate from all turmas.
         """
         alunos = []
         if id_turma:
-            resp = self._send_request(f"LIST_ALUNOS_POR_TURMA|{id_turma}")
-            if not resp or "Nenhum aluno" in resp:
-                return alunos
-            for linha in resp.strip().split('\n'):
-                if not linha: continue
-                partes = linha.split(', ')
-                try:
-                    matricula = partes[0].split(': ')[1]
-                    nome = partes[1].split(': ')[1]
-                    alunos.append((matricula, f"{matricula} - {nome}"))
-                except Exception:
-                    continue
-            return alunos
+            registros = self._send_request_parsed(f"LIST_ALUNOS_POR_TURMA|{id_turma}",
+                                                  parse_alunos_response, ttl)
+            return [(a['matricula'], f"{a['matricula']} - {a['nome']}") for a in registros]
 
         # Aggregate across all turmas
         turmas = self._get_turmas_list()
+        if self.role == 'professor':
+            acessiveis = self.db.get_accessible_subject_ids(self.username)
         for t in turmas:
             tid = t['id']
             # Se for professor, verificar acesso
-            if self.role == 'professor' and not self.db.can_access_subject(self.username, tid):
+            if self.role == 'professor' and str(tid) not in acessiveis:
                 continue  # Pular turmas sem acesso
             
-            resp = self._send_request(f"LIST_ALUNOS_POR_TURMA|{tid}")
-            if not resp or "Nenhum aluno" in resp:
-                continue
-            for linha in resp.strip().split('\n'):
-                if not linha: continue
-                partes = linha.split(', ')
-                try:
-                    matricula = partes[0].split(': ')[1]
-                    nome = partes[1].split(': ')[1]
-                    alunos.append((matricula, f"{matricula} - {nome}"))
-                except Exception:
-                    continue
+            for a in self._send_request_parsed(f"LIST_ALUNOS_POR_TURMA|{tid}", parse_alunos_response):
+                alunos.append((a['matricula'], f"{a['matricula']} - {a['nome']}"))
         return alunos
     
     def listar_alunos_turma(self):
@@ -4676,14 +5403,9 @@ class App(tk.Tk):
             self._refresh_aluno_list(id_t)
         else:
             # Professor e Admin selecionam a turma
+            # _ask_turma_dropdown só retorna IDs já filtrados por get_accessible_subject_ids
             id_t = self._ask_turma_dropdown(title="Listar Alunos - Selecionar Turma")
             if id_t:
-                # Verificação de acesso adicional (segurança extra)
-                if self.role == 'professor' and not self.db.can_access_subject(self.username, id_t):
-                    messagebox.showerror("Acesso Negado", 
-                                       f"Você não tem permissão para visualizar alunos desta turma (ID: {id_t}).\n"
-                                       f"Entre em contato com o administrador para solicitar acesso.")
-                    return
                 self._refresh_aluno_list(id_t)
 
     def pesquisar_aluno(self):
@@ -4727,37 +5449,32 @@ class App(tk.Tk):
                                      font=('Arial', 11, 'bold'), padx=15, pady=15)
         search_frame.pack(fill=tk.X, pady=(0, 20))
         
+        notas_vazias = {'np1': 0.0, 'np2': 0.0, 'pim': 0.0, 'media': 0.0, 'exame': 0.0}
+
         # Coletar todos os alunos acessíveis
         alunos_disponiveis = []
         
         # Buscar todas as turmas
-        turmas_resp = self._send_request("LIST_TURMAS")
-        if turmas_resp and "Nenhuma turma" not in turmas_resp:
-            for linha in turmas_resp.strip().split('\n'):
-                if linha:
-                    partes = linha.split(', ')
-                    tid = partes[0].split(': ')[1]
-                    
-                    # Verificar se professor tem acesso
-                    if self.role == 'professor' and not self.db.can_access_subject(self.username, tid):
-                        continue
-                    
-                    # Buscar alunos da turma
-                    alunos_resp = self._send_request(f"LIST_ALUNOS_POR_TURMA|{tid}")
-                    if alunos_resp and "Nenhum aluno" not in alunos_resp:
-                        for aluno_linha in alunos_resp.strip().split('\n'):
-                            if aluno_linha:
-                                partes_aluno = aluno_linha.split(', ')
-                                matricula = partes_aluno[0].split(': ')[1]
-                                nome = partes_aluno[1].split(': ')[1]
-                                
-                                # Evitar duplicados
-                                if not any(a['matricula'] == matricula for a in alunos_disponiveis):
-                                    alunos_disponiveis.append({
-                                        'matricula': matricula,
-                                        'nome': nome,
-                                        'turma_id': tid
-                                    })
+        if self.role == 'professor':
+            acessiveis = self.db.get_accessible_subject_ids(self.username)
+        for turma in self._send_request_parsed("LIST_TURMAS", parse_turmas_response):
+            tid = turma['id']
+            
+            # Verificar se professor tem acesso
+            if self.role == 'professor' and str(tid) not in acessiveis:
+                continue
+            
+            # Buscar alunos da turma (a resposta já traz as notas de cada aluno)
+            for aluno in self._send_request_parsed(f"LIST_ALUNOS_POR_TURMA|{tid}", parse_alunos_response):
+                # Evitar duplicados
+                if not any(a['matricula'] == aluno['matricula'] for a in alunos_disponiveis):
+                    aluno_info = dict(aluno)
+                    aluno_info.update({
+                        'turma_id': tid,
+                        'disciplina': turma['disciplina'],
+                        'professor': turma['professor']
+                    })
+                    alunos_disponiveis.append(aluno_info)
         
         if not alunos_disponiveis:
             tk.Label(search_frame, text="Nenhum aluno encontrado.", 
@@ -4771,7 +5488,11 @@ class App(tk.Tk):
                 bg=self.colors['card'], fg=self.colors['text']).pack(anchor='w', pady=(0, 5))
         
         aluno_var = tk.StringVar()
-        aluno_values = [f"{a['matricula']} - {a['nome']}" for a in alunos_disponiveis]
+        # Rótulo do combobox -> registro do aluno (evita split(' - ') e busca linear por seleção)
+        alunos_por_rotulo = {}
+        for a in alunos_disponiveis:
+            alunos_por_rotulo[f"{a['matricula']} - {a['nome']}"] = a
+        aluno_values = tuple(alunos_por_rotulo)
         aluno_combo = ttk.Combobox(search_frame, textvariable=aluno_var,
                                    values=aluno_values,
                                    state="readonly", width=60, font=('Arial', 10))
@@ -4801,71 +5522,117 @@ class App(tk.Tk):
         canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        def exibir_informacoes():
-            """Carrega e exibe informações do aluno selecionado"""
-            # Limpar frame
-            for widget in scrollable_frame.winfo_children():
-                widget.destroy()
-            
-            if not aluno_var.get():
+        # Foto no topo (conteúdo trocado a cada pesquisa)
+        foto_frame = tk.Frame(scrollable_frame, bg=self.colors['card'])
+        foto_frame.pack(pady=(0, 15))
+
+        # Seções e campos são criados uma única vez; cada pesquisa apenas atualiza os StringVar
+        secoes = [
+            ("Informações Básicas", ["Matrícula", "Nome", "Email", "Username"]),
+            ("Turma e Notas", ["Turma ID", "Disciplina", "Professor", "NP1", "NP2", "PIM",
+                               "Média", "Exame", "Faltas", "Status"]),
+            ("Informações do Sistema", ["Data de Criação", "Último Acesso", "Tempo de Uso Total"])
+        ]
+        campos_vars = {}
+        campos_labels = {}
+        for section_title, labels in secoes:
+            # Título da seção
+            section_label = tk.Label(scrollable_frame, text=section_title,
+                                    font=('Arial', 12, 'bold'),
+                                    bg=self.colors['primary'], fg='white',
+                                    padx=10, pady=5)
+            section_label.pack(fill=tk.X, pady=(10, 0))
+
+            # Campos da seção
+            for label in labels:
+                field_frame = tk.Frame(scrollable_frame, bg=self.colors['card'])
+                field_frame.pack(fill=tk.X, pady=2)
+
+                tk.Label(field_frame, text=f"{label}:", font=('Arial', 10, 'bold'),
+                        bg=self.colors['card'], fg=self.colors['text'],
+                        width=20, anchor='w').pack(side=tk.LEFT, padx=5)
+
+                var = tk.StringVar()
+                valor_label = tk.Label(field_frame, textvariable=var, font=('Arial', 10),
+                                       bg=self.colors['input_bg'], fg=self.colors['text'],
+                                       relief='solid', bd=1, padx=8, pady=3)
+                valor_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+                campos_vars[label] = var
+                campos_labels[label] = valor_label
+        # Um único cálculo de layout para todos os campos recém-criados
+        scrollable_frame.update_idletasks()
+
+        # Últimos valores exibidos: campos inalterados não disparam StringVar.set
+        ultimos_valores = {}
+
+        def atualizar_campo(label, valor):
+            valor = str(valor)
+            if ultimos_valores.get(label) != valor:
+                campos_vars[label].set(valor)
+                ultimos_valores[label] = valor
+                return True
+            return False
+
+        def exibir_informacoes(dados_locais=False):
+            """Carrega e exibe informações do aluno selecionado.
+            Com dados_locais=True usa as notas/turma já obtidas na abertura do dialog,
+            sem nova consulta ao servidor; caso contrário as consultas rodam fora da
+            thread do Tk e a tela é preenchida quando as respostas chegam."""
+            rotulo = aluno_var.get()
+            aluno_info = alunos_por_rotulo.get(rotulo)
+            if not aluno_info:
                 return
             
-            matricula = aluno_var.get().split(' - ')[0]
-            
-            # Buscar informações do aluno
-            aluno_info = next((a for a in alunos_disponiveis if a['matricula'] == matricula), None)
-            if not aluno_info:
+            if dados_locais:
+                # Warm start: dados já carregados junto com a lista de alunos
+                renderizar(aluno_info, aluno_info['disciplina'], aluno_info['professor'], aluno_info)
                 return
             
+            matricula = aluno_info['matricula']
             tid = aluno_info['turma_id']
+            respostas = {}
             
-            # Buscar dados completos da turma
-            turma_resp = self._send_request(f"GET_TURMA_DATA|{tid}")
-            disciplina, professor = "", ""
-            if turma_resp and "ERRO" not in turma_resp:
-                disciplina, professor = turma_resp.split('|')
-            
-            # Buscar notas do aluno DIRETAMENTE DO SERVIDOR
-            alunos_turma_resp = self._send_request(f"LIST_ALUNOS_POR_TURMA|{tid}")
-            np1, np2, pim, media, exame = 0.0, 0.0, 0.0, 0.0, 0.0
-            
-            if alunos_turma_resp and "Nenhum aluno" not in alunos_turma_resp:
-                for linha in alunos_turma_resp.strip().split('\n'):
-                    if linha and f"Matrícula: {matricula}" in linha:
-                        partes = linha.split(', ')
-                        for p in partes[2:]:
-                            if p.startswith('NP1:'):
-                                try:
-                                    np1 = float(p.split(': ')[1])
-                                except:
-                                    np1 = 0.0
-                            elif p.startswith('NP2:'):
-                                try:
-                                    np2 = float(p.split(': ')[1])
-                                except:
-                                    np2 = 0.0
-                            elif p.startswith('PIM:'):
-                                try:
-                                    pim = float(p.split(': ')[1])
-                                except:
-                                    pim = 0.0
-                            elif p.startswith('Média:'):
-                                try:
-                                    media = float(p.split(': ')[1])
-                                except Exception:
-                                    media = 0.0
-                            elif p.startswith('Exame:'):
-                                try:
-                                    exame = float(p.split(': ')[1])
-                                except Exception:
-                                    exame = 0.0
-                        break
+            def ao_receber(chave, resp):
+                respostas[chave] = resp
+                if len(respostas) < 2:
+                    return
+                # Ignorar respostas atrasadas (dialog fechado ou outro aluno selecionado)
+                if not dialog.winfo_exists() or aluno_var.get() != rotulo:
+                    return
+                
+                # Dados completos da turma
+                disciplina, professor = "", ""
+                turma_resp = respostas['turma']
+                if turma_resp and "ERRO" not in turma_resp:
+                    disciplina, _, professor = turma_resp.partition('|')
+                
+                # Notas do aluno DIRETAMENTE DO SERVIDOR
+                notas = next((a for a in parse_alunos_response(respostas['alunos'])
+                              if a['matricula'] == matricula), notas_vazias)
+                renderizar(aluno_info, disciplina, professor, notas)
+            
+            self._send_request_async(f"GET_TURMA_DATA|{tid}",
+                                     lambda resp: ao_receber('turma', resp), cached=True)
+            self._send_request_async(f"LIST_ALUNOS_POR_TURMA|{tid}",
+                                     lambda resp: ao_receber('alunos', resp))
+
+        def renderizar(aluno_info, disciplina, professor, notas):
+            """Preenche foto e campos do dialog com os dados já obtidos"""
+            # Limpar apenas a foto; os campos são reaproveitados
+            for widget in foto_frame.winfo_children():
+                widget.destroy()
+            
+            matricula = aluno_info['matricula']
+            tid = aluno_info['turma_id']
+            np1, np2, pim = notas['np1'], notas['np2'], notas['pim']
+            media, exame = notas['media'], notas['exame']
             
             # Calcular faltas
             faltas = 0
             try:
+                mat_int = int(matricula)
                 for rec in read_presencas_dat(tid):
-                    if str(rec.get('matricula')) == str(matricula) and not rec.get('presente'):
+                    if rec.get('matricula') == mat_int and not rec.get('presente'):
                         faltas += 1
             except Exception:
                 pass
@@ -4895,116 +5662,74 @@ class App(tk.Tk):
             email, data_criacao, ultimo_acesso, tempo_uso = "", "", "", ""
             foto_perfil_path = None
             
-            for username, user_data in self.db.users.items():
-                if user_data.get('matricula') == int(matricula):
-                    username_aluno = username
-                    email = user_data.get('email', 'Não informado')
-                    data_criacao = user_data.get('created_at', 'Não informado')
-                    ultimo_acesso = user_data.get('last_login', 'Nunca acessou')
-                    tempo_uso_seg = user_data.get('total_time', 0)
-                    foto_perfil_path = user_data.get('foto_perfil')
-                    
-                    # Converter tempo de uso para formato legível
-                    horas = tempo_uso_seg // 3600
-                    minutos = (tempo_uso_seg % 3600) // 60
-                    tempo_uso = f"{int(horas)}h {int(minutos)}min"
-                    break
-            
+            username_aluno = self.db.get_username_by_matricula(matricula)
+            user_data = self.db.users.get(username_aluno) if username_aluno else None
+            if user_data is not None:
+                email = user_data.get('email', 'Não informado')
+                data_criacao = user_data.get('created_at', 'Não informado')
+                ultimo_acesso = user_data.get('last_login', 'Nunca acessou')
+                tempo_uso_seg = user_data.get('total_time', 0)
+                foto_perfil_path = user_data.get('foto_perfil')
+                
+                # Converter tempo de uso para formato legível
+                horas = tempo_uso_seg // 3600
+                minutos = (tempo_uso_seg % 3600) // 60
+                tempo_uso = f"{int(horas)}h {int(minutos)}min"
+
             # Exibir foto de perfil no topo
-            foto_frame = tk.Frame(scrollable_frame, bg=self.colors['card'])
-            foto_frame.pack(pady=(0, 15))
-            
+            photo = None
             try:
                 if foto_perfil_path and os.path.exists(foto_perfil_path):
-                    from PIL import Image, ImageTk, ImageDraw
-                    img = Image.open(foto_perfil_path)
-                    img = img.resize((60, 60), Image.Resampling.LANCZOS)
-                    
-                    # Criar máscara circular
-                    mask = Image.new('L', (60, 60), 0)
-                    draw = ImageDraw.Draw(mask)
-                    draw.ellipse((0, 0, 60, 60), fill=255)
-                    
-                    # Aplicar máscara
-                    output = Image.new('RGBA', (60, 60), (0, 0, 0, 0))
-                    output.paste(img, (0, 0))
-                    output.putalpha(mask)
-                    
-                    photo = ImageTk.PhotoImage(output)
-                    foto_label = tk.Label(foto_frame, image=photo, bg=self.colors['card'])
-                    foto_label.image = photo  # Manter referência
-                    foto_label.pack()
-                else:
-                    # Placeholder se não tiver foto
-                    placeholder = tk.Label(foto_frame, text="👤", font=('Arial', 40), 
-                                         bg=self.colors['border'], fg=self.colors['text_secondary'],
-                                         width=3, height=1)
-                    placeholder.pack()
-            except Exception as e:
-                # Placeholder em caso de erro
-                placeholder = tk.Label(foto_frame, text="👤", font=('Arial', 40), 
-                                     bg=self.colors['border'], fg=self.colors['text_secondary'],
-                                     width=3, height=1)
-                placeholder.pack()
-            
+                    photo = self._foto_perfil_redonda(foto_perfil_path, 60)
+            except Exception:
+                photo = None
+            if photo is not None:
+                foto_label = tk.Label(foto_frame, image=photo, bg=self.colors['card'])
+                foto_label.image = photo  # Manter referência
+                foto_label.pack()
+            else:
+                # Placeholder se não tiver foto (ou em caso de erro)
+                self._make_placeholder(foto_frame).pack()
+            
+            # Notas formatadas uma única vez por pesquisa
+            notas_fmt = {
+                "NP1": f"{np1:.1f}",
+                "NP2": f"{np2:.1f}",
+                "PIM": f"{pim:.1f}",
+                "Média": f"{media:.1f}",
+                "Exame": f"{exame:.1f}"
+            }
+
             # Exibir informações organizadas
-            sections = [
-                ("Informações Básicas", [
-                    ("Matrícula", matricula),
-                    ("Nome", aluno_info['nome']),
-                    ("Email", email),
-                    ("Username", username_aluno or "Não encontrado")
-                ]),
-                ("Turma e Notas", [
-                    ("Turma ID", tid),
-                    ("Disciplina", disciplina),
-                    ("Professor", professor),
-                    ("NP1", f"{np1:.1f}"),
-                    ("NP2", f"{np2:.1f}"),
-                    ("PIM", f"{pim:.1f}"),
-                    ("Média", f"{media:.1f}"),
-                    ("Exame", f"{exame:.1f}"),
-                    ("Faltas", str(faltas)),
-                    ("Status", status)
-                ]),
-                ("Informações do Sistema", [
-                    ("Data de Criação", data_criacao),
-                    ("Último Acesso", ultimo_acesso),
-                    ("Tempo de Uso Total", tempo_uso)
-                ])
-            ]
-            
-            for section_title, fields in sections:
-                # Título da seção
-                section_label = tk.Label(scrollable_frame, text=section_title, 
-                                        font=('Arial', 12, 'bold'), 
-                                        bg=self.colors['primary'], fg='white',
-                                        padx=10, pady=5)
-                section_label.pack(fill=tk.X, pady=(10, 0))
-                
-                # Campos da seção
-                for label, value in fields:
-                    field_frame = tk.Frame(scrollable_frame, bg=self.colors['card'])
-                    field_frame.pack(fill=tk.X, pady=2)
-                    
-                    tk.Label(field_frame, text=f"{label}:", font=('Arial', 10, 'bold'),
-                            bg=self.colors['card'], fg=self.colors['text'],
-                            width=20, anchor='w').pack(side=tk.LEFT, padx=5)
-                    
-                    # Colorir status
-                    fg_color = self.colors['text']
-                    if label == "Status":
-                        if "Aprovado" in value:
-                            fg_color = '#28a745'  # Verde
-                        elif "Reprovado" in value:
-                            fg_color = '#dc3545'  # Vermelho
-                        elif "Pendente" in value:
-                            fg_color = '#ffc107'  # Amarelo
-                    
-                    tk.Label(field_frame, text=str(value), font=('Arial', 10),
-                            bg=self.colors['input_bg'], fg=fg_color,
-                            relief='solid', bd=1, padx=8, pady=3).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-        
+            valores = {
+                "Matrícula": matricula,
+                "Nome": aluno_info['nome'],
+                "Email": email,
+                "Username": username_aluno or "Não encontrado",
+                "Turma ID": tid,
+                "Disciplina": disciplina,
+                "Professor": professor,
+                "Faltas": faltas,
+                "Data de Criação": data_criacao,
+                "Último Acesso": ultimo_acesso,
+                "Tempo de Uso Total": tempo_uso
+            }
+            valores.update(notas_fmt)
+
+            for label, value in valores.items():
+                atualizar_campo(label, value)
+
+            # Colorir status (somente quando o valor mudou)
+            if atualizar_campo("Status", status):
+                fg_color = self.colors['text']
+                if "Aprovado" in status:
+                    fg_color = '#28a745'  # Verde
+                elif "Reprovado" in status:
+                    fg_color = '#dc3545'  # Vermelho
+                elif "Pendente" in status:
+                    fg_color = '#ffc107'  # Amarelo
+                campos_labels["Status"].configure(fg=fg_color)
+
         # Botão pesquisar
         search_btn = ttk.Button(search_frame, text="Pesquisar", command=exibir_informacoes,
                   style='Dialog.TButton')
@@ -5021,9 +5746,9 @@ class App(tk.Tk):
         # Habilitar scroll com mousewheel
         _enable_canvas_scroll(canvas, scrollable_frame)
         
-        # Carregar informações do primeiro aluno automaticamente
+        # Carregar informações do primeiro aluno automaticamente (sem nova consulta)
         if aluno_values:
-            dialog.after(100, exibir_informacoes)
+            exibir_informacoes(dados_locais=True)
 
     def pesquisar_professor(self):
         """Pesquisa detalhada de informações de professores - apenas para admin"""
@@ -5068,14 +5793,17 @@ class App(tk.Tk):
         
         # Coletar todos os professores
         professores_disponiveis = []
+        professores_por_username = {}
         
         for username, user_data in self.db.users.items():
             if user_data.get('role') == 'professor':
-                professores_disponiveis.append({
+                prof = {
                     'username': username,
                     'email': user_data.get('email', 'Não informado'),
                     'subjects': user_data.get('subjects', [])
-                })
+                }
+                professores_disponiveis.append(prof)
+                professores_por_username[username] = prof
         
         if not professores_disponiveis:
             tk.Label(search_frame, text="Nenhum professor encontrado.", 
@@ -5119,19 +5847,53 @@ class App(tk.Tk):
         canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
+        # Foto no topo: um único Label, trocado entre imagem e placeholder a cada pesquisa
+        foto_frame = tk.Frame(scrollable_frame, bg=self.colors['card'])
+        foto_frame.pack(pady=(0, 15))
+        foto_label = tk.Label(foto_frame, bg=self.colors['card'])
+        foto_label.pack()
+
+        # Seções e campos são criados uma única vez; cada pesquisa apenas atualiza os StringVar
+        secoes = [
+            ("Informações Básicas", ["Username", "Email", "Turno"]),
+            ("Turmas Atribuídas", ["Turmas"]),
+            ("Informações do Sistema", ["Data de Criação", "Último Acesso", "Tempo de Uso Total"])
+        ]
+        campos_vars = {}
+        for section_title, labels in secoes:
+            # Título da seção
+            section_label = tk.Label(scrollable_frame, text=section_title, 
+                                    font=('Arial', 12, 'bold'), 
+                                    bg=self.colors['primary'], fg='white',
+                                    padx=10, pady=5)
+            section_label.pack(fill=tk.X, pady=(10, 0))
+            
+            # Campos da seção
+            for label in labels:
+                field_frame = tk.Frame(scrollable_frame, bg=self.colors['card'])
+                field_frame.pack(fill=tk.X, pady=2)
+                
+                tk.Label(field_frame, text=f"{label}:", font=('Arial', 10, 'bold'),
+                        bg=self.colors['card'], fg=self.colors['text'],
+                        width=20, anchor='w').pack(side=tk.LEFT, padx=5)
+                
+                var = tk.StringVar()
+                tk.Label(field_frame, textvariable=var, font=('Arial', 10),
+                        bg=self.colors['input_bg'], fg=self.colors['text'],
+                        relief='solid', bd=1, padx=8, pady=3).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+                campos_vars[label] = var
+        # Um único cálculo de layout para todos os campos recém-criados
+        scrollable_frame.update_idletasks()
+
         def exibir_informacoes():
             """Carrega e exibe informações do professor selecionado"""
-            # Limpar frame
-            for widget in scrollable_frame.winfo_children():
-                widget.destroy()
-            
             if not prof_var.get():
                 return
             
             username = prof_var.get()
             
             # Buscar informações do professor
-            prof_info = next((p for p in professores_disponiveis if p['username'] == username), None)
+            prof_info = professores_por_username.get(username)
             if not prof_info:
                 return
             
@@ -5141,52 +5903,30 @@ class App(tk.Tk):
             foto_perfil_path = user_data.get('foto_perfil')
             
             # Exibir foto de perfil no topo
-            foto_frame = tk.Frame(scrollable_frame, bg=self.colors['card'])
-            foto_frame.pack(pady=(0, 15))
-            
+            photo = None
             try:
                 if foto_perfil_path and os.path.exists(foto_perfil_path):
-                    from PIL import Image, ImageTk, ImageDraw
-                    img = Image.open(foto_perfil_path)
-                    img = img.resize((60, 60), Image.Resampling.LANCZOS)
-                    
-                    # Criar máscara circular
-                    mask = Image.new('L', (60, 60), 0)
-                    draw = ImageDraw.Draw(mask)
-                    draw.ellipse((0, 0, 60, 60), fill=255)
-                    
-                    # Aplicar máscara
-                    output = Image.new('RGBA', (60, 60), (0, 0, 0, 0))
-                    output.paste(img, (0, 0))
-                    output.putalpha(mask)
-                    
-                    photo = ImageTk.PhotoImage(output)
-                    foto_label = tk.Label(foto_frame, image=photo, bg=self.colors['card'])
-                    foto_label.image = photo
-                    foto_label.pack()
-                else:
-                    placeholder = tk.Label(foto_frame, text="👤", font=('Arial', 40), 
-                                         bg=self.colors['border'], fg=self.colors['text_secondary'],
-                                         width=3, height=1)
-                    placeholder.pack()
+                    photo = self._foto_perfil_redonda(foto_perfil_path, 60)
             except Exception:
-                placeholder = tk.Label(foto_frame, text="👤", font=('Arial', 40), 
-                                     bg=self.colors['border'], fg=self.colors['text_secondary'],
-                                     width=3, height=1)
-                placeholder.pack()
-            
-            # Buscar turmas associadas
+                photo = None
+            if photo is not None:
+                foto_label.configure(image=photo, text='', bg=self.colors['card'], width=0, height=0)
+                foto_label.image = photo
+            else:
+                # Placeholder se não tiver foto
+                self._make_placeholder(foto_label)
+                foto_label.configure(image='')
+                foto_label.image = None
+            
+            # Buscar turmas associadas
             turmas_associadas = []
             if prof_info['subjects']:
-                turmas_resp = self._send_request("LIST_TURMAS")
-                if turmas_resp and "Nenhuma turma" not in turmas_resp:
-                    for linha in turmas_resp.strip().split('\n'):
-                        if linha:
-                            partes = linha.split(', ')
-                            tid = partes[0].split(': ')[1]
-                            if str(tid) in [str(s) for s in prof_info['subjects']]:
-                                disciplina = partes[1].split(': ')[1] if len(partes) > 1 else "N/A"
-                                turmas_associadas.append(f"ID {tid} - {disciplina}")
+                subjects_set = frozenset(str(s) for s in prof_info['subjects'])
+                for turma in self._send_request_parsed("LIST_TURMAS", parse_turmas_response):
+                    tid = turma['id']
+                    if str(tid) in subjects_set:
+                        disciplina = turma['disciplina'] or "N/A"
+                        turmas_associadas.append(f"ID {tid} - {disciplina}")
             
             turmas_texto = ", ".join(turmas_associadas) if turmas_associadas else "Nenhuma turma atribuída"
             
@@ -5203,42 +5943,17 @@ class App(tk.Tk):
             tempo_uso = f"{int(horas)}h {int(minutos)}min"
             
             # Exibir informações organizadas
-            sections = [
-                ("Informações Básicas", [
-                    ("Username", username),
-                    ("Email", email),
-                    ("Turno", turno.title())
-                ]),
-                ("Turmas Atribuídas", [
-                    ("Turmas", turmas_texto)
-                ]),
-                ("Informações do Sistema", [
-                    ("Data de Criação", data_criacao),
-                    ("Último Acesso", ultimo_acesso),
-                    ("Tempo de Uso Total", tempo_uso)
-                ])
-            ]
-            
-            for section_title, fields in sections:
-                # Título da seção
-                section_label = tk.Label(scrollable_frame, text=section_title, 
-                                        font=('Arial', 12, 'bold'), 
-                                        bg=self.colors['primary'], fg='white',
-                                        padx=10, pady=5)
-                section_label.pack(fill=tk.X, pady=(10, 0))
-                
-                # Campos da seção
-                for label, value in fields:
-                    field_frame = tk.Frame(scrollable_frame, bg=self.colors['card'])
-                    field_frame.pack(fill=tk.X, pady=2)
-                    
-                    tk.Label(field_frame, text=f"{label}:", font=('Arial', 10, 'bold'),
-                            bg=self.colors['card'], fg=self.colors['text'],
-                            width=20, anchor='w').pack(side=tk.LEFT, padx=5)
-                    
-                    tk.Label(field_frame, text=str(value), font=('Arial', 10),
-                            bg=self.colors['input_bg'], fg=self.colors['text'],
-                            relief='solid', bd=1, padx=8, pady=3).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+            valores = {
+                "Username": username,
+                "Email": email,
+                "Turno": turno.title(),
+                "Turmas": turmas_texto,
+                "Data de Criação": data_criacao,
+                "Último Acesso": ultimo_acesso,
+                "Tempo de Uso Total": tempo_uso
+            }
+            for label, value in valores.items():
+                campos_vars[label].set(str(value))
         
         # Botão pesquisar
         search_btn = ttk.Button(search_frame, text="Pesquisar", command=exibir_informacoes,
@@ -5277,16 +5992,14 @@ class App(tk.Tk):
         dlg.transient(self); dlg.grab_set()
         _center_window(dlg)
         ttk.Label(dlg, text="Selecione o Aluno:").pack(padx=10, pady=(10, 4))
-        combo = ttk.Combobox(dlg, values=[a[1] for a in alunos], state='readonly')
+        # Rótulo do combobox -> matrícula
+        mat_by_label = {label: mat for mat, label in alunos}
+        combo = ttk.Combobox(dlg, values=list(mat_by_label), state='readonly')
         combo.pack(fill=tk.X, padx=10)
         combo.current(0)
         result = {'value': None}
         def ok():
-            sel = combo.get()
-            for mat, label in alunos:
-                if label == sel:
-                    result['value'] = mat
-                    break
+            result['value'] = mat_by_label.get(combo.get())
             dlg.destroy()
         def cancel():
             dlg.destroy()
@@ -5312,11 +6025,8 @@ class App(tk.Tk):
         # Filtrar turmas baseado no acesso do usuário
         if self.role == 'professor':
             # Professor só vê turmas que tem acesso
-            turmas_acessiveis = []
-            for t in turmas:
-                if self.db.can_access_subject(self.username, t['id']):
-                    turmas_acessiveis.append(t)
-            turmas = turmas_acessiveis
+            acessiveis = self.db.get_accessible_subject_ids(self.username)
+            turmas = [t for t in turmas if str(t['id']) in acessiveis]
         
         if not turmas:
             if self.role == 'professor':
@@ -5336,8 +6046,10 @@ class App(tk.Tk):
         dlg.transient(self); dlg.grab_set()
         _center_window(dlg)
 
+        # Rótulo do combobox -> id da turma
+        label_to_id = {t['tuple'][1]: t['id'] for t in turmas}
         ttk.Label(dlg, text="Turma:").pack(anchor='w', padx=10, pady=(10,0))
-        turma_combo = ttk.Combobox(dlg, values=[t['tuple'][1] for t in turmas], state='readonly')
+        turma_combo = ttk.Combobox(dlg, values=list(label_to_id), state='readonly')
         turma_combo.pack(fill=tk.X, padx=10)
         # preselect last turma if available
         init_idx = 0
@@ -5351,41 +6063,52 @@ class App(tk.Tk):
         aluno_combo = ttk.Combobox(dlg, values=[], state='readonly')
         aluno_combo.pack(fill=tk.X, padx=10)
 
+        # Rótulo do aluno -> matrícula (da turma atualmente selecionada)
+        mat_by_label = {}
+
         # Fill aluno combo when turma changes
         def refresh_alunos(event=None):
-            sel = turma_combo.get()
-            sel_tid = None
-            for t in turmas:
-                if t['tuple'][1] == sel:
-                    sel_tid = t['id']; break
+            sel_tid = label_to_id.get(turma_combo.get())
+            mat_by_label.clear()
+            aluno_combo['values'] = []
             if not sel_tid:
-                aluno_combo['values'] = []
-                return
-            alunos = self._get_alunos_list(sel_tid)
-            aluno_combo['values'] = [a[1] for a in alunos]
-            if alunos:
-                aluno_combo.current(0)
-            else:
                 aluno_combo.set('')
+                return
+            aluno_combo.set('Carregando...')
+            
+            def preencher(resp):
+                # Ignorar se o dialog fechou ou outra turma foi escolhida nesse meio tempo
+                if not dlg.winfo_exists() or label_to_id.get(turma_combo.get()) != sel_tid:
+                    return
+                alunos = [(a['matricula'], f"{a['matricula']} - {a['nome']}")
+                          for a in parse_alunos_response(resp)]
+                mat_by_label.update((lbl, m) for m, lbl in alunos)
+                aluno_combo['values'] = [a[1] for a in alunos]
+                if alunos:
+                    aluno_combo.current(0)
+                else:
+                    aluno_combo.set('')
+            
+            # Busca fora da thread do Tk; aceita respostas pré-carregadas ao abrir o dialog
+            self._send_request_async(f"LIST_ALUNOS_POR_TURMA|{sel_tid}", preencher,
+                                     cached=True, ttl=PREFETCH_CACHE_TTL)
 
         turma_combo.bind('<<ComboboxSelected>>', refresh_alunos)
         # initial fill
         refresh_alunos()
+        
+        # Pré-carregar em segundo plano os alunos das turmas vizinhas à pré-selecionada,
+        # assim a troca de turma mais provável já encontra a resposta no cache
+        for idx in range(max(0, init_idx - 1), min(len(turmas), init_idx + 3)):
+            if idx != init_idx:
+                self._send_request_async(f"LIST_ALUNOS_POR_TURMA|{turmas[idx]['id']}",
+                                         lambda resp: None, cached=True, mostrar_erro=False)
 
         result = {'value': None}
         def ok():
-            turma_label = turma_combo.get()
+            tid = label_to_id.get(turma_combo.get())
             aluno_label = aluno_combo.get()
-            tid = None; mat = None
-            for t in turmas:
-                if t['tuple'][1] == turma_label:
-                    tid = t['id']; break
-            if aluno_label:
-                # find matricula
-                alunos = self._get_alunos_list(tid)
-                for m, lbl in alunos:
-                    if lbl == aluno_label:
-                        mat = m; break
+            mat = mat_by_label.get(aluno_label) if aluno_label else None
             result['value'] = (tid, mat)
             try:
                 self._last_turma = tid
@@ -5408,38 +6131,36 @@ class App(tk.Tk):
         self.wait_window(dlg)
         return result['value']
     def listar_turmas(self):
-        resp = self._send_request("LIST_TURMAS")
+        # Uma única requisição traz turno e total de alunos de todas as turmas
+        resp = self._send_request_cached("LIST_TURMAS_WITH_COUNTS")
         if resp is not None and resp != "Nenhuma turma cadastrada.":
             turmas_data = []
             turno_usuario = self.db.users.get(self.username, {}).get('turno', 'matutino')
             
             for linha in resp.strip().split('\n'):
                 if linha:
-                    # Extrai os dados da linha
-                    partes = linha.split(', ')
-                    id_turma = partes[0].split(': ')[1]
-                    disciplina = partes[1].split(': ')[1]
-                    professor = partes[2].split(': ')[1]
-                    
-                    # Buscar turno da turma
-                    turno_turma = get_turno_turma(id_turma)
+                    # Extrai os dados da linha: id|disciplina|professor|turno|total_alunos
+                    partes = linha.split('|')
+                    if len(partes) < 5:
+                        continue
+                    id_turma, disciplina, professor, turno_turma = partes[0], partes[1], partes[2], partes[3]
                     
                     # Filtrar por turno se não for admin
                     if self.role != 'admin':
                         if turno_turma != turno_usuario:
                             continue  # Pula turmas de outros turnos
                     
-                    # Conta alunos da turma
-                    alunos_resp = self._send_request(f"LIST_ALUNOS_POR_TURMA|{id_turma}")
-                    total_alunos = 0
-                    if alunos_resp and "Nenhum aluno" not in alunos_resp:
-                        total_alunos = len(alunos_resp.strip().split('\n'))
+                    try:
+                        total_alunos = int(partes[4])
+                    except ValueError:
+                        total_alunos = 0
                     
                     # Ícone do turno
                     turno_icone = {'matutino': '', 'vespertino': '', 'noturno': ''}.get(turno_turma, '🕐')
                     turno_display = f"{turno_icone} {turno_turma.title()}"
                     
-                    turmas_data.append([id_turma, disciplina, professor, turno_display, total_alunos])
+                    # Tupla: formato aceito direto por Treeview.insert(values=...)
+                    turmas_data.append((id_turma, disciplina, professor, turno_display, total_alunos))
             
             # Atualiza o display com o novo formato
             headers = ["ID", "Disciplina", "Professor", "Turno", "Total Alunos"]
@@ -5447,6 +6168,23 @@ class App(tk.Tk):
         else:
             self._update_display("Lista de Turmas", [], [])
     
+    def _get_turno_turma(self, id_turma):
+        """Turno de uma turma, via cache de requisições (invalidado por qualquer comando de escrita,
+        incluindo SET_TURNO, ADD_TURMA, DELETE_TURMA e CHANGE_TURMA_ID)."""
+        resp = self._send_request_cached(f"GET_TURNO|{id_turma}")
+        if resp and not resp.startswith("ERRO"):
+            return resp
+        return 'matutino'
+
+    def _get_turma_do_aluno(self, matricula):
+        """Retorna (id_turma, disciplina) da turma do aluno com a matrícula informada,
+        ou (None, None) se o aluno não estiver em nenhuma turma."""
+        resp = self._send_request_cached(f"GET_TURMA_DO_ALUNO|{matricula}")
+        if not resp or resp.startswith("ERRO"):
+            return None, None
+        id_turma, _, disciplina = resp.partition('|')
+        return id_turma, disciplina
+
     def calendario_provas(self):
         """Interface de calendário de provas com controle de acesso por perfil"""
         # Admin tem acesso total
@@ -5466,29 +6204,8 @@ class App(tk.Tk):
             messagebox.showerror("Erro", "Você não possui uma matrícula associada. Entre em contato com o administrador.")
             return
         
-        # Buscar turma do aluno
-        resp_list = self._send_request(f"LIST_TURMAS")
-        if not resp_list or "Nenhuma turma" in resp_list:
-            messagebox.showerror("Erro", "Nenhuma turma encontrada.")
-            return
-        
-        id_turma = None
-        disciplina = None
-        for linha in resp_list.strip().split('\n'):
-            if linha:
-                partes = linha.split(', ')
-                tid = partes[0].split(': ')[1]
-                disc = partes[1].split(': ')[1]
-                
-                alunos_resp = self._send_request(f"LIST_ALUNOS_POR_TURMA|{tid}")
-                if alunos_resp and "Nenhum aluno" not in alunos_resp:
-                    for aluno_linha in alunos_resp.strip().split('\n'):
-                        if aluno_linha and f"Matrícula: {matricula}" in aluno_linha:
-                            id_turma = tid
-                            disciplina = disc
-                            break
-                if id_turma:
-                    break
+        # Buscar turma do aluno (uma única consulta ao servidor)
+        id_turma, disciplina = self._get_turma_do_aluno(matricula)
         
         if not id_turma:
             messagebox.showerror("Erro", "Sua turma não foi encontrada.")
@@ -5520,48 +6237,66 @@ class App(tk.Tk):
         tk.Label(main_frame, text=f"Disciplina: {disciplina}", 
                 font=('Arial', 12), bg=self.colors['card'], fg=self.colors['text']).pack(pady=(0, 20))
         
-        # Buscar datas das provas
-        provas = get_provas_turma(id_turma)
         hoje = datetime.now().strftime('%d/%m/%Y')
         
         # Frame de provas
         provas_frame = tk.Frame(main_frame, bg=self.colors['card'])
         provas_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 20))
         
-        tipos_prova = [
-            ('NP1', 'NP1 - Primeira Avaliação', provas.get('NP1')),
-            ('NP2', 'NP2 - Segunda Avaliação', provas.get('NP2')),
-            ('PIM', 'PIM - Trabalho Semestral', provas.get('PIM')),
-            ('Exame', 'Exame - Recuperação', provas.get('Exame'))
-        ]
+        carregando_label = tk.Label(provas_frame, text="Carregando datas...", 
+                                    font=('Arial', 10, 'italic'), 
+                                    bg=self.colors['card'], fg=self.colors['text_secondary'])
+        carregando_label.pack(pady=10)
         
-        for tipo, nome, data in tipos_prova:
-            prova_card = tk.Frame(provas_frame, bg=self.colors['card'], relief='solid', bd=1, padx=15, pady=12)
-            prova_card.pack(fill=tk.X, pady=5)
+        def exibir_provas(resp):
+            """Monta os cards das provas quando a resposta do servidor chega"""
+            if not provas_frame.winfo_exists():
+                return
+            carregando_label.destroy()
+            provas = {}
+            if resp and not resp.startswith("ERRO"):
+                try:
+                    provas = json.loads(resp)
+                except Exception:
+                    provas = {}
             
-            # Determinar cor do card
-            card_bg = self.colors['card']
-            data_color = self.colors['text']
+            tipos_prova = [
+                ('NP1', 'NP1 - Primeira Avaliação', provas.get('NP1')),
+                ('NP2', 'NP2 - Segunda Avaliação', provas.get('NP2')),
+                ('PIM', 'PIM - Trabalho Semestral', provas.get('PIM')),
+                ('Exame', 'Exame - Recuperação', provas.get('Exame'))
+            ]
             
-            if data and data == hoje:
-                card_bg = '#FFEBEE' if not getattr(self, 'dark_mode', False) else '#4D1B1B'
-                data_color = '#C00000'
+            for tipo, nome, data in tipos_prova:
+                prova_card = tk.Frame(provas_frame, bg=self.colors['card'], relief='solid', bd=1, padx=15, pady=12)
+                prova_card.pack(fill=tk.X, pady=5)
             
-            prova_card.config(bg=card_bg)
+                # Determinar cor do card
+                card_bg = self.colors['card']
+                data_color = self.colors['text']
             
-            tk.Label(prova_card, text=nome, font=('Arial', 12, 'bold'), 
-                    bg=card_bg, fg=self.colors['text']).pack(anchor='w')
+                if data and data == hoje:
+                    card_bg = '#FFEBEE' if not getattr(self, 'dark_mode', False) else '#4D1B1B'
+                    data_color = '#C00000'
             
-            if data:
-                data_text = f"Data: {data}"
-                if data == hoje:
-                    data_text += " HOJE!"
-                tk.Label(prova_card, text=data_text, font=('Arial', 11), 
-                        bg=card_bg, fg=data_color).pack(anchor='w', pady=(5, 0))
-            else:
-                tk.Label(prova_card, text="Data ainda não definida", 
-                        font=('Arial', 10, 'italic'), 
-                        bg=card_bg, fg=self.colors['text_secondary']).pack(anchor='w', pady=(5, 0))
+                prova_card.config(bg=card_bg)
+            
+                tk.Label(prova_card, text=nome, font=('Arial', 12, 'bold'), 
+                        bg=card_bg, fg=self.colors['text']).pack(anchor='w')
+            
+                if data:
+                    data_text = f"Data: {data}"
+                    if data == hoje:
+                        data_text += " HOJE!"
+                    tk.Label(prova_card, text=data_text, font=('Arial', 11), 
+                            bg=card_bg, fg=data_color).pack(anchor='w', pady=(5, 0))
+                else:
+                    tk.Label(prova_card, text="Data ainda não definida", 
+                            font=('Arial', 10, 'italic'), 
+                            bg=card_bg, fg=self.colors['text_secondary']).pack(anchor='w', pady=(5, 0))
+        
+        # Buscar datas das provas sem travar a interface
+        self._send_request_async(f"GET_PROVAS_TURMA|{id_turma}", exibir_provas, cached=True)
         
         # Botão fechar
         close_btn = ttk.Button(main_frame, text="Fechar", command=dialog.destroy, 
@@ -5608,11 +6343,8 @@ class App(tk.Tk):
         
         # Filtrar por permissão se for professor
         if self.role == 'professor':
-            turmas_acessiveis = []
-            for t in turmas:
-                if self.db.can_access_subject(self.username, t['id']):
-                    turmas_acessiveis.append(t)
-            turmas = turmas_acessiveis
+            acessiveis = self.db.get_accessible_subject_ids(self.username)
+            turmas = [t for t in turmas if str(t['id']) in acessiveis]
         
         if not turmas:
             tk.Label(main_frame, text="Nenhuma turma disponível para gerenciar.", 
@@ -5622,8 +6354,9 @@ class App(tk.Tk):
             return
         
         turma_var = tk.StringVar()
+        label_to_id = {f"{t['id']} - {t['tuple'][1]}": t['id'] for t in turmas}
         turma_combo = ttk.Combobox(turma_frame, textvariable=turma_var, 
-                                   values=[f"{t['id']} - {t['tuple'][1]}" for t in turmas], 
+                                   values=list(label_to_id), 
                                    state="readonly", width=50)
         turma_combo.pack(anchor='w')
         turma_combo.current(0)
@@ -5680,14 +6413,17 @@ class App(tk.Tk):
             entry.bind('<FocusIn>', on_focus_in)
             entry.bind('<FocusOut>', on_focus_out)
         
+        # Datas de todas as turmas carregadas uma única vez ao abrir o dialog
+        provas_por_turma = get_all_provas()
+        
         def carregar_datas(event=None):
             """Carrega as datas da turma selecionada"""
             sel = turma_combo.get()
             if not sel:
                 return
             
-            tid = sel.split(' - ')[0]
-            provas = get_provas_turma(tid)
+            tid = label_to_id[sel]
+            provas = provas_por_turma.get(tid, {})
             
             for tipo, entry in date_entries.items():
                 entry.delete(0, tk.END)
@@ -5707,7 +6443,7 @@ class App(tk.Tk):
                 messagebox.showwarning("Aviso", "Selecione uma turma!")
                 return
             
-            tid = sel.split(' - ')[0]
+            tid = label_to_id[sel]
             
             # Validar e salvar datas
             datas_validas = {}
@@ -5715,7 +6451,7 @@ class App(tk.Tk):
                 data = entry.get()
                 if data and data != 'DD/MM/AAAA':
                     # Validar formato
-                    if not re.match(r'^\d{2}/\d{2}/\d{4}$', data):
+                    if not _DATE_RE.match(data):
                         messagebox.showerror("Erro", f"Data inválida para {tipo}. Use o formato DD/MM/AAAA")
                         return
                     datas_validas[tipo.lower()] = data
@@ -5724,6 +6460,11 @@ class App(tk.Tk):
             
             # Salvar
             if set_provas_turma(tid, **datas_validas):
+                # Manter o cache local em sincronia (o servidor só altera as datas informadas)
+                provas_turma = provas_por_turma.setdefault(tid, {})
+                for tipo in date_entries:
+                    if datas_validas[tipo.lower()]:
+                        provas_turma[tipo] = datas_validas[tipo.lower()]
                 messagebox.showinfo("Sucesso", "Datas das provas salvas com sucesso!")
             else:
                 messagebox.showerror("Erro", "Erro ao salvar datas das provas.")
@@ -5850,56 +6591,33 @@ class App(tk.Tk):
     
     def _gerar_proxima_matricula(self):
         """Gera automaticamente a próxima matrícula incremental"""
-        matriculas_existentes = []
+        maior = 0
         
         # Verificar matrículas dos usuários no sistema JSON
         for user_data in self.db.users.values():
             if 'matricula' in user_data and user_data['matricula']:
                 try:
                     mat = int(user_data['matricula'])
-                    if mat > 0:  # Validar que a matrícula é positiva
-                        matriculas_existentes.append(mat)
+                    if mat > maior:  # Matrículas não positivas nunca passam de 0
+                        maior = mat
                 except (ValueError, TypeError):
                     pass
         
         # Verificar matrículas de todos os alunos cadastrados no sistema C
+        # (o servidor devolve só a maior, em uma única requisição)
         try:
-            # Buscar todas as turmas e seus alunos
-            turmas_resp = self._send_request("LIST_TURMAS")
-            if turmas_resp and "Nenhuma turma" not in turmas_resp:
-                for linha in turmas_resp.strip().split('\n'):
-                    if linha.strip():  # Verificar se a linha não está vazia
-                        try:
-                            # Extrair ID da turma com mais segurança
-                            partes = linha.split(',')
-                            if len(partes) > 0 and ':' in partes[0]:
-                                id_turma = partes[0].split(':')[1].strip()
-                                # Buscar alunos desta turma
-                                alunos_resp = self._send_request(f"LIST_ALUNOS_POR_TURMA|{id_turma}")
-                                if alunos_resp and "Nenhum aluno" not in alunos_resp:
-                                    for aluno_linha in alunos_resp.strip().split('\n'):
-                                        if aluno_linha.strip() and 'Matrícula:' in aluno_linha:
-                                            try:
-                                                # Formato: "Matrícula: XXXXX, Nome: YYY, ..."
-                                                mat_str = aluno_linha.split(',')[0].split(':')[1].strip()
-                                                mat = int(mat_str)
-                                                if mat > 0:  # Validar que a matrícula é positiva
-                                                    matriculas_existentes.append(mat)
-                                            except (ValueError, IndexError):
-                                                pass
-                        except (ValueError, IndexError, AttributeError):
-                            continue
+            max_resp = self._send_request("MAX_MATRICULA")
+            if max_resp and not max_resp.startswith("ERRO"):
+                mat = int(max_resp)
+                if mat > maior:
+                    maior = mat
         except Exception as e:
             print(f"Aviso: Erro ao buscar matrículas do sistema C: {e}")
             pass  # Se falhar, continua com as matrículas do JSON apenas
         
-        if matriculas_existentes:
-            proxima_mat = max(matriculas_existentes) + 1
-            print(f"Debug: Matrículas existentes: {len(matriculas_existentes)}, Próxima matrícula: {proxima_mat}")
-            return proxima_mat
-        else:
-            print("Debug: Nenhuma matrícula existente encontrada, iniciando em 20250001")
-            return 20250001  # Primeira matrícula: Ano 2025 + 0001
+        if maior:
+            return maior + 1
+        return 20250001  # Primeira matrícula: Ano 2025 + 0001
 
     def cadastrar_aluno(self):
         # Apenas admin pode cadastrar alunos
@@ -5949,10 +6667,12 @@ class App(tk.Tk):
         tk.Label(main_frame, text="Selecionar Turma:", font=('Arial', 10, 'bold'), 
                 bg=self.colors['card'], fg=self.colors['text']).pack(anchor='w')
         turma_var = tk.StringVar()
+        turno_por_id = {t['id']: t['turno'] for t in turmas}
+        label_to_id = {t['label']: t['id'] for t in turmas}
         turma_combo = ttk.Combobox(main_frame, textvariable=turma_var,
-                                   values=[f"{t['id']} - {t['nome_disciplina']}" for t in turmas],
+                                   values=list(label_to_id),
                                    state="readonly", width=40, font=('Arial', 10))
-        turma_combo.set(f"{turmas[0]['id']} - {turmas[0]['nome_disciplina']}")
+        turma_combo.set(turmas[0]['label'])
         turma_combo.pack(fill=tk.X, pady=(3, 15))
         
         # Nome
@@ -5966,7 +6686,7 @@ class App(tk.Tk):
                 messagebox.showerror("Erro", "O nome é obrigatório!")
                 return
             
-            tid = turma_var.get().split(' - ')[0]
+            tid = label_to_id[turma_var.get()]
             nome_aluno = nome_entry.get()
             
             # Criar usuário para o aluno automaticamente
@@ -5976,8 +6696,8 @@ class App(tk.Tk):
             # Verificar se já existe um usuário com esse nome
             user_exists = aluno_username in self.db.users
             
-            # Buscar turno da turma
-            turno_turma = get_turno_turma(tid)
+            # Turno da turma já veio com _get_turmas_list
+            turno_turma = turno_por_id.get(tid) or self._get_turno_turma(tid)
             
             if not user_exists:
                 # Criar novo usuário aluno com matrícula
@@ -6028,15 +6748,22 @@ class App(tk.Tk):
         if not id_t:
             return
 
-        turma_resp = self._send_request(f"GET_TURMA_DATA|{id_t}")
+        # As leituras independentes saem juntas pelo _io_pool: a espera passa a ser a da mais
+        # lenta, e não a soma de todas. Os resultados só são usados se o acesso for permitido.
+        alunos_fut = self._io_pool.submit(send_server_command, f"LIST_ALUNOS_POR_TURMA|{id_t}")
+        exames_fut = self._io_pool.submit(load_all_notas_exame)
+        notas_fut = self._io_pool.submit(load_notas_dat)
+        presencas_fut = self._io_pool.submit(read_presencas_dat, id_t)
+
+        turma_resp = self._send_request_cached(f"GET_TURMA_DATA|{id_t}")
         if not turma_resp or "ERRO" in turma_resp:
             messagebox.showerror("Erro", "Turma não encontrada")
             return
 
-        disc, prof = turma_resp.split('|')
+        disc, _, prof = turma_resp.partition('|')
         
         # Buscar turno da turma
-        turno_turma = get_turno_turma(id_t)
+        turno_turma = self._get_turno_turma(id_t)
         turno_usuario = self.db.users.get(self.username, {}).get('turno', 'matutino')
         
         # Verificar se usuário tem acesso a esta turma (por turno)
@@ -6048,28 +6775,23 @@ class App(tk.Tk):
                                    f"Seu turno: {turno_usuario.title()}")
                 return
         
-        resp = self._send_request(f"LIST_ALUNOS_POR_TURMA|{id_t}")
+        resp = alunos_fut.result()
+        if resp is None:
+            messagebox.showerror("Erro de Conexão", "Não foi possível conectar ao servidor.")
+            return
 
         if not resp or "Nenhum aluno" in resp:
             self._update_display(f"Alunos da Turma {id_t} - {disc}", [], [])
             return
 
-        alunos_data = []
-        for linha in resp.strip().split('\n'):
-            if not linha: continue
-            partes = linha.split(', ')
-            matricula, nome = partes[0].split(': ')[1], partes[1].split(': ')[1]
-            np1, np2, pim, media = "0.0", "0.0", "0.0", "0.0"
-            for p in partes[2:]:
-                if p.startswith('NP1:'): np1 = p.split(': ')[1]
-                elif p.startswith('NP2:'): np2 = p.split(': ')[1]
-                elif p.startswith('PIM:'): pim = p.split(': ')[1]
-                elif p.startswith('Média:'): media = p.split(': ')[1]
-            alunos_data.append([matricula, nome, np1, np2, pim, media])
+        alunos_data = [
+            [m['mat'], m['nome'], m['np1'] or "0.0", m['np2'] or "0.0", m['pim'] or "0.0", m['media'] or "0.0"]
+            for m in _ALUNO_LINE_RE.finditer(resp)
+        ]
 
         # Suplementa notas do arquivo local (fallback)
         try:
-            notas_map = load_notas_dat()
+            notas_map = notas_fut.result()
             if notas_map:
                 for row in alunos_data:
                     m = str(row[0])
@@ -6083,15 +6805,21 @@ class App(tk.Tk):
             pass
 
         # Calcula e adiciona faltas
-        faltas_map = {}
+        faltas_map = collections.Counter()
         try:
-            for rec in read_presencas_dat(id_t):
-                if not rec.get('presente'):
-                    mkey = str(rec.get('matricula'))
-                    faltas_map[mkey] = faltas_map.get(mkey, 0) + 1
+            faltas_map = collections.Counter(
+                str(rec.get('matricula')) for rec in presencas_fut.result() if not rec.get('presente')
+            )
         except Exception:
             pass
 
+        # Notas de exame de todos os alunos em uma única requisição
+        exames = exames_fut.result()
+
+        # O turno é o mesmo para toda a turma: formatar uma única vez
+        turno_icone = {'matutino': '', 'vespertino': '', 'noturno': ''}.get(turno_turma, '🕐')
+        turno_display = f"{turno_icone} {turno_turma.title()}"
+
         # Calcula status final e formata a linha para exibição
         # Lógica correta de aprovação conforme especificado
         for row in alunos_data:
@@ -6102,8 +6830,7 @@ class App(tk.Tk):
             media_val = float(row[5]) if row[5] else 0.0
             faltas = faltas_map.get(str(row[0]), 0)
             
-            # Buscar nota de exame do arquivo
-            nota_exame = get_nota_exame(row[0])
+            nota_exame = exames.get(str(row[0]), 0.0)
             
             # Verificar se há notas atribuídas
             tem_notas = (np1_val > 0 or np2_val > 0 or pim_val > 0)
@@ -6127,10 +6854,6 @@ class App(tk.Tk):
             else:
                 status = "Pendente"
             
-            # Adicionar turno
-            turno_icone = {'matutino': '', 'vespertino': '', 'noturno': ''}.get(turno_turma, '🕐')
-            turno_display = f"{turno_icone} {turno_turma.title()}"
-            
             row.extend([str(faltas), turno_display, f"{nota_exame:.1f}", status])
 
         headers = ["Matrícula", "Nome", "NP1", "NP2", "PIM", "Média", "Faltas", "Turno", "Exame", "Status"]
@@ -6205,11 +6928,7 @@ class App(tk.Tk):
         id_t, mat = sel
         
         # Buscar username do usuário pela matrícula
-        username_aluno = None
-        for uname, udata in self.db.users.items():
-            if udata.get('role') == 'aluno' and udata.get('matricula') == int(mat):
-                username_aluno = uname
-                break
+        username_aluno = self.db.get_username_by_matricula(mat)
         
         dialog = tk.Toplevel(self)
         dialog.configure(bg=self.colors['card'])
@@ -6258,9 +6977,10 @@ class App(tk.Tk):
             # Buscar turmas disponíveis
             turmas_disponiveis = self._get_turmas_list()
             nova_turma_var = tk.StringVar()
+            label_to_id = {t['label']: t['id'] for t in turmas_disponiveis}
             
             nova_turma_combo = ttk.Combobox(turma_frame, textvariable=nova_turma_var,
-                                           values=[f"{t['id']} - {t['nome_disciplina']}" for t in turmas_disponiveis],
+                                           values=list(label_to_id),
                                            state="readonly", width=40)
             nova_turma_combo.pack(anchor='w', padx=10, pady=(5, 15))
             
@@ -6272,7 +6992,7 @@ class App(tk.Tk):
                     messagebox.showwarning("Aviso", "Selecione uma turma!")
                     return
                 
-                nova_turma_id = nova_turma_var.get().split(' - ')[0]
+                nova_turma_id = label_to_id[nova_turma_var.get()]
                 
                 if nova_turma_id == id_t:
                     messagebox.showwarning("Aviso", "O aluno já está nesta turma!")
@@ -6368,24 +7088,25 @@ class App(tk.Tk):
         # Buscar alunos sem turma no sistema C
         alunos_sem_turma = []
         
-        print(f"[DEBUG] Procurando alunos sem turma...")
+        # Uma única consulta traz todas as matrículas com turma; o resto é diferença de conjuntos
+        resp = self._send_request("LIST_ALL_ENROLLED_MATRICULAS")
+        if resp is None:
+            return
+        if resp.startswith("ERRO"):
+            messagebox.showerror("Erro", resp)
+            return
+        matriculadas = {int(m) for m in resp.split() if m.isdigit()}
+        
         for username, data in self.db.users.items():
             if data.get('role') == 'aluno':
                 matricula = data.get('matricula')
-                print(f"[DEBUG] Verificando {username} - Matrícula: {matricula}")
-                
-                # Verificar se tem matrícula
-                tem_turma = False
-                if matricula:
-                    # Verificar se existe no sistema C
-                    resp = self._send_request(f"GET_ALUNO_DATA|{matricula}")
-                    print(f"[DEBUG] Resposta para {matricula}: {resp}")
-                    if resp and "ERRO" not in resp:
-                        tem_turma = True
+                try:
+                    tem_turma = bool(matricula) and int(matricula) in matriculadas
+                except (TypeError, ValueError):
+                    tem_turma = False
                 
                 # Se não tem turma no sistema C, adicionar à lista
                 if not tem_turma:
-                    print(f"[DEBUG] {username} NÃO tem turma - adicionando à lista")
                     status = data.get('status', 'approved')
                     alunos_sem_turma.append({
                         'username': username,
@@ -6393,10 +7114,6 @@ class App(tk.Tk):
                         'email': data.get('email', 'Não cadastrado'),
                         'status': status
                     })
-                else:
-                    print(f"[DEBUG] {username} TEM turma - ignorando")
-        
-        print(f"[DEBUG] Total de alunos sem turma: {len(alunos_sem_turma)}")
         
         if not alunos_sem_turma:
             messagebox.showinfo("Informação", "Não há alunos sem turma para editar.\n\nTodos os alunos já estão associados a turmas.")
@@ -6435,9 +7152,13 @@ class App(tk.Tk):
         listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.config(command=listbox.yview)
         
-        for aluno in alunos_sem_turma:
-            status_badge = "Aprovado" if aluno['status'] == 'approved' else "Pendente"
-            listbox.insert(tk.END, f"[{status_badge}] {aluno['username']} | Matrícula: {aluno['matricula']} | {aluno['email']}")
+        # Todas as linhas em uma única chamada ao Tcl
+        linhas = [
+            f"[{'Aprovado' if aluno['status'] == 'approved' else 'Pendente'}] {aluno['username']} | "
+            f"Matrícula: {aluno['matricula']} | {aluno['email']}"
+            for aluno in alunos_sem_turma
+        ]
+        listbox.insert(tk.END, *linhas)
         
         result = {'aluno': None}
         
@@ -6526,9 +7247,10 @@ class App(tk.Tk):
         turmas = self._get_turmas_list()
         
         turma_var = tk.StringVar()
+        label_to_id = {t['label']: t['id'] for t in turmas}
         if turmas:
             turma_combo = ttk.Combobox(turma_frame, textvariable=turma_var,
-                                      values=['Não associar'] + [f"{t['id']} - {t['nome_disciplina']}" for t in turmas],
+                                      values=['Não associar'] + list(label_to_id),
                                       state="readonly", width=45, font=('Arial', 10))
             turma_combo.set('Não associar')
             turma_combo.pack(fill=tk.X)
@@ -6553,7 +7275,7 @@ class App(tk.Tk):
             
             # 2. Associar a turma se selecionada
             if turmas and turma_var.get() != 'Não associar':
-                tid = turma_var.get().split(' - ')[0]
+                tid = label_to_id[turma_var.get()]
                 matricula = user_data.get('matricula')
                 
                 if not matricula:
@@ -6592,12 +7314,8 @@ class App(tk.Tk):
     def lancar_notas(self):
         id_t = self._ask_turma_dropdown(title="Lançar Notas - Selecionar Turma")
         if not id_t: return
-
-        # Verifica se a turma existe
-        turma_resp = self._send_request(f"GET_TURMA_DATA|{id_t}")
-        if not turma_resp or "ERRO" in turma_resp:
-            messagebox.showerror("Erro", "Turma não encontrada!")
-            return
+        # A existência da turma é confirmada pelo próprio LIST_ALUNOS_POR_TURMA
+        # em NotasDialog.carregar_dados (que fecha o dialog se vier ERRO)
         
         # Verificação de acesso adicional (segurança extra)
         if self.role == 'professor' and not self.db.can_access_subject(self.username, id_t):
@@ -6674,6 +7392,14 @@ class App(tk.Tk):
                 self.parent = parent
                 self.id_turma = id_turma
                 self.tipo_nota = tipo_nota  # "comum" ou "exame"
+                # Notas carregadas em carregar_dados: matrícula (str) -> {'np1', 'np2', 'pim', 'media'}
+                self._alunos_grades = {}
+                # Inserção em lotes ainda agendada (after) de um carregamento anterior
+                self._insercao_job = None
+                # Limpeza agendada (after) do aviso de salvamento no status_label
+                self._aviso_job = None
+                # Notas aplicadas na tabela mas ainda não enviadas: matrícula (str) -> (np1, np2, pim, media)
+                self._pendentes = {}
                 # Herdar cores e fontes do parent
                 self.colors = parent.colors
                 self.fonts = parent.fonts
@@ -6732,6 +7458,10 @@ class App(tk.Tk):
                                        foreground=self.colors.get('text', '#172B4D'))
                 self.tree.tag_configure('even', background=self.colors.get('row_even', 'white'),
                                        foreground=self.colors.get('text', '#172B4D'))
+                # Cor do status (mesmas do display principal); configuradas depois de
+                # odd/even para que o foreground delas prevaleça
+                self.tree.tag_configure('aprovado', foreground='#3CB371')
+                self.tree.tag_configure('reprovado', foreground='#F44336')
                 
                 # Adicionar scrollbar
                 # Layout da tabela
@@ -6779,22 +7509,57 @@ class App(tk.Tk):
                 save_btn = ttk.Button(btn_frame, text="Atualizar Notas", 
                           command=self.atualizar_notas)
                 save_btn.pack(side=tk.LEFT, padx=5)
+                if self.tipo_nota == "comum":
+                    # Lançamento em lote: aplicar várias notas na tabela e enviar todas de uma vez
+                    ttk.Button(btn_frame, text="Aplicar na Lista",
+                              command=self.aplicar_na_lista).pack(side=tk.LEFT, padx=5)
+                    self.salvar_todas_btn = ttk.Button(btn_frame, text="Salvar Todas",
+                                                       command=self.salvar_todas)
+                    self.salvar_todas_btn.pack(side=tk.LEFT, padx=5)
                 # Removed Recomputar button per UX request
                 cancel_btn = ttk.Button(btn_frame, text="Cancelar", 
-                          command=lambda: self.dialog.destroy())
+                          command=self.fechar)
                 cancel_btn.pack(side=tk.RIGHT, padx=5)
+                # Aviso de salvamento bem-sucedido (erros continuam em messagebox)
+                self.status_label = ttk.Label(btn_frame, text="", foreground='#3CB371')
+                self.status_label.pack(side=tk.RIGHT, padx=5)
                 
                 # Configurar atalhos (ESC fecha, Enter atualiza)
-                _setup_dialog_shortcuts(self.dialog, ok_button=save_btn, cancel_callback=self.dialog.destroy)
+                _setup_dialog_shortcuts(self.dialog, ok_button=save_btn, cancel_callback=self.fechar)
+                self.dialog.protocol("WM_DELETE_WINDOW", self.fechar)
                 
                 # Bind da seleção
                 self.tree.bind('<<TreeviewSelect>>', self.on_select)
                 
-                # Carregar dados
-                self.carregar_dados()
+                # Carregar dados e selecionar automaticamente o primeiro aluno quando chegarem
+                self.carregar_dados(ao_concluir=self.selecionar_primeiro_aluno)
+                
+            def _em_segundo_plano(self, funcao, ao_concluir, *args):
+                """Executa `funcao(*args)` no _io_pool do parent e entrega o resultado a
+                `ao_concluir` na thread do Tk, se o dialog ainda estiver aberto."""
+                def entregar(resultado):
+                    if self.dialog.winfo_exists():
+                        ao_concluir(resultado)
+                
+                def concluido(fut):
+                    try:
+                        resultado = fut.result()
+                    except Exception:
+                        resultado = None
+                    try:
+                        self.dialog.after(0, entregar, resultado)
+                    except Exception:
+                        pass  # Dialog (ou a janela principal) já foi fechado
+                
+                self.parent._io_pool.submit(funcao, *args).add_done_callback(concluido)
                 
-                # Selecionar automaticamente o primeiro aluno após carregar os dados
-                self.dialog.after(100, self.selecionar_primeiro_aluno)
+            def _reselecionar(self, matricula):
+                """Seleciona novamente o aluno após recarregar a tabela"""
+                iid = str(matricula)
+                if self.tree.exists(iid):
+                    self.tree.selection_set(iid)
+                    self.tree.focus(iid)
+                    self.tree.see(iid)
                 
             def selecionar_primeiro_aluno(self):
                 """Seleciona automaticamente o primeiro aluno da lista"""
@@ -6805,62 +7570,216 @@ class App(tk.Tk):
                     # Disparar o evento de seleção manualmente
                     self.tree.event_generate('<<TreeviewSelect>>')
                 
-            def carregar_dados(self):
-                resp = self.parent._send_request(f"LIST_ALUNOS_POR_TURMA|{self.id_turma}")
+            def carregar_dados(self, ao_concluir=None):
+                """Busca alunos e exames fora da thread do Tk e preenche a tabela ao receber"""
+                id_turma = self.id_turma
+                
+                def buscar():
+                    # Executa no _io_pool: apenas rede, nada de widgets
+                    resp = send_server_command(f"LIST_ALUNOS_POR_TURMA|{id_turma}")
+                    # O servidor já inclui o Exame em cada linha; só servidores antigos
+                    # exigem buscar as notas de exame à parte (uma única requisição)
+                    if not resp or "Nenhum aluno" in resp or "Exame:" in resp:
+                        return resp, {}
+                    return resp, load_all_notas_exame()
+                
+                def preencher(resultado):
+                    resp, exames = resultado or (None, {})
+                    if resp is None:
+                        messagebox.showerror("Erro de Conexão", "Não foi possível conectar ao servidor.")
+                    elif resp.startswith("ERRO"):
+                        messagebox.showerror("Erro", f"Turma não encontrada!\n{resp}")
+                        self.dialog.destroy()
+                        return
+                    self._preencher_tabela(resp, exames, ao_concluir)
+                
+                self._em_segundo_plano(buscar, preencher)
+                
+            def _preencher_tabela(self, resp, exames, ao_concluir=None):
+                """Preenche a tabela com a resposta de LIST_ALUNOS_POR_TURMA, em lotes de
+                DISPLAY_BATCH_SIZE linhas (como _update_display), e chama `ao_concluir` no fim"""
+                if self._insercao_job is not None:
+                    self.dialog.after_cancel(self._insercao_job)
+                    self._insercao_job = None
+                self.tree.delete(*self.tree.get_children())
+                self._alunos_grades = {}
+                # A tabela volta a refletir o servidor: edições não enviadas são descartadas
+                self._pendentes = {}
+                self._atualizar_contador_pendentes()
+                linhas = []
                 if resp and "Nenhum aluno" not in resp:
-                    for i, linha in enumerate(resp.strip().split('\n')):
-                        if linha:
-                            partes = linha.split(', ')
-                            matricula = partes[0].split(': ')[1]
-                            nome = partes[1].split(': ')[1]
-                            # Try to parse provided grades
+                    for i, m in enumerate(_ALUNO_LINE_RE.finditer(resp)):
+                        matricula, nome = m['mat'], m['nome']
+                        # Notas ausentes na linha contam como 0
+                        try:
+                            np1 = float(m['np1'] or 0.0)
+                            np2 = float(m['np2'] or 0.0)
+                            pim = float(m['pim'] or 0.0)
+                            media = float(m['media'] or 0.0)
+                        except ValueError:
                             np1 = np2 = pim = media = 0.0
-                            for p in partes[2:]:
-                                if p.startswith('NP1:'):
-                                    np1 = float(p.split(': ')[1])
-                                elif p.startswith('NP2:'):
-                                    np2 = float(p.split(': ')[1])
-                                elif p.startswith('PIM:'):
-                                    pim = float(p.split(': ')[1])
-                                elif p.startswith('Média:'):
-                                    try:
-                                        media = float(p.split(': ')[1])
-                                    except Exception:
-                                        media = 0.0
-                            
-                            # Buscar nota de exame
-                            exame = get_nota_exame(matricula)
-                            
-                            # Calcular status com lógica correta
-                            tem_notas = (np1 > 0 or np2 > 0 or pim > 0)
-                            if not tem_notas:
-                                status = "Pendente Atribuir Notas"
-                            elif media >= 7.0:
-                                status = "Aprovado"
-                            elif media < 7.0 and exame == 0.0:
-                                status = "Pendente Exame"
-                            elif media < 7.0 and exame >= 5.0:
-                                status = "Aprovado (Exame)"
-                            elif media < 7.0 and exame < 5.0:
-                                status = "Reprovado"
-                            else:
-                                status = "Pendente"
-                            
-                            row_tags = ('even' if i % 2 == 0 else 'odd', 'aprovado' if 'Aprovado' in status else 'reprovado')
-                            
-                            # Inserir dados baseado no tipo de nota
-                            if self.tipo_nota == "comum":
-                                # Mostrar apenas Matrícula, Nome, NP1, NP2, PIM, Média
-                                self.tree.insert("", tk.END, values=(matricula, nome, f"{np1:.1f}", f"{np2:.1f}", f"{pim:.1f}", f"{media:.1f}"),
-                                              tags=row_tags)
-                            else:  # exame
-                                # Mostrar apenas Matrícula, Nome, Média, Exame, Status
-                                self.tree.insert("", tk.END, values=(matricula, nome, f"{media:.1f}", f"{exame:.1f}", status),
-                                              tags=row_tags)
+                        self._alunos_grades[str(matricula)] = {'np1': np1, 'np2': np2, 'pim': pim, 'media': media}
+                        
+                        exame = float(m['exame']) if m['exame'] else exames.get(str(matricula), 0.0)
+                        
+                        status, status_tag = status_aluno(np1, np2, pim, media, exame)
+                        row_tags = ('even' if i % 2 == 0 else 'odd', status_tag)
+                        
+                        # Inserir dados baseado no tipo de nota
+                        if self.tipo_nota == "comum":
+                            # Mostrar apenas Matrícula, Nome, NP1, NP2, PIM, Média
+                            linhas.append(((matricula, nome, f"{np1:.1f}", f"{np2:.1f}", f"{pim:.1f}", f"{media:.1f}"), row_tags))
+                        else:  # exame
+                            # Mostrar apenas Matrícula, Nome, Média, Exame, Status
+                            linhas.append(((matricula, nome, f"{media:.1f}", f"{exame:.1f}", status), row_tags))
+                
+                def inserir_lote(inicio):
+                    # O primeiro lote aparece na hora; os demais são agendados, sem travar o dialog
+                    self._insercao_job = None
+                    for valores, tags in linhas[inicio:inicio + DISPLAY_BATCH_SIZE]:
+                        # A matrícula é o iid da linha: permite localizá-la sem varrer a árvore
+                        self.tree.insert("", tk.END, iid=str(valores[0]), values=valores, tags=tags)
+                    proximo = inicio + DISPLAY_BATCH_SIZE
+                    if proximo < len(linhas):
+                        self._insercao_job = self.dialog.after(1, inserir_lote, proximo)
+                    elif ao_concluir:
+                        ao_concluir()
+                
+                inserir_lote(0)
                 
             def calcular_media(self, np1, np2, pim):
                 return (np1 * 4 + np2 * 4 + pim * 2) / 10
                 
+            def _aplicar_notas_comuns(self, item, valores_atuais):
+                """Lê NP1/NP2/PIM digitados, valida e atualiza a linha na árvore.
+                Retorna (np1, np2, pim, media) ou None se as notas forem inválidas."""
+                # 1. Obtenha as notas atuais diretamente da tabela como base.
+                np1_atual = float(valores_atuais[2])
+                np2_atual = float(valores_atuais[3])
+                pim_atual = float(valores_atuais[4])
+
+                # 2. Leia o que foi digitado nos campos.
+                np1_texto = self.nota_entries["NP1"].get().strip()
+                np2_texto = self.nota_entries["NP2"].get().strip()
+                pim_texto = self.nota_entries["PIM"].get().strip()
+
+                # 3. Use o valor digitado se houver. Se não, mantenha o valor atual.
+                np1 = float(np1_texto) if np1_texto else np1_atual
+                np2 = float(np2_texto) if np2_texto else np2_atual
+                pim = float(pim_texto) if pim_texto else pim_atual
+
+                # Validar notas
+                notas_lancadas = (np1, np2, pim)
+                if min(notas_lancadas) < 0 or max(notas_lancadas) > 10:
+                    messagebox.showerror("Erro", "As notas NP1, NP2 e PIM devem estar entre 0 e 10!")
+                    return None
+                
+                # Calcular média
+                media = self.calcular_media(np1, np2, pim)
+                
+                # Atualizar valores na árvore
+                novos_valores = (valores_atuais[0], valores_atuais[1], f"{np1:.1f}", f"{np2:.1f}", f"{pim:.1f}", f"{media:.1f}")
+                self.tree.item(item, values=novos_valores)
+                return np1, np2, pim, media
+                
+            def _restaurar_linha(self, matricula):
+                """Volta a linha do aluno para as últimas notas confirmadas pelo servidor"""
+                iid = str(matricula)
+                notas = self._alunos_grades.get(iid)
+                if notas is None or not self.tree.exists(iid):
+                    return
+                valores = self.tree.item(iid)["values"]
+                self.tree.item(iid, values=(valores[0], valores[1], f"{notas['np1']:.1f}", f"{notas['np2']:.1f}",
+                                            f"{notas['pim']:.1f}", f"{notas['media']:.1f}"))
+                
+            def aplicar_na_lista(self):
+                """Aplica as notas digitadas na tabela sem enviar; o envio é feito por salvar_todas"""
+                selection = self.tree.selection()
+                if not selection:
+                    messagebox.showwarning("Aviso", "Selecione um aluno primeiro!")
+                    return
+                item = selection[0]
+                valores_atuais = self.tree.item(item)["values"]
+                try:
+                    notas = self._aplicar_notas_comuns(item, valores_atuais)
+                except ValueError:
+                    messagebox.showerror("Erro", "Por favor, insira apenas números válidos!")
+                    return
+                if notas is None:
+                    return
+                self._pendentes[str(valores_atuais[0])] = notas
+                self._atualizar_contador_pendentes()
+                
+                # Avançar para o próximo aluno, agilizando o lançamento da turma inteira
+                proximo = self.tree.next(item)
+                if proximo:
+                    self.tree.selection_set(proximo)
+                    self.tree.focus(proximo)
+                    self.tree.see(proximo)
+                
+            def salvar_todas(self):
+                """Envia todas as notas aplicadas na lista em um único UPDATE_NOTAS_BULK"""
+                if not self._pendentes:
+                    messagebox.showinfo("Informação", "Não há notas aplicadas para salvar.")
+                    return
+                enviadas = dict(self._pendentes)
+                lote = ";".join(
+                    f"{mat}:{np1}:{np2}:{pim}:{round(media, 1)}"
+                    for mat, (np1, np2, pim, media) in enviadas.items()
+                )
+                
+                def concluir(resp):
+                    if resp and "SUCESSO" in resp:
+                        for mat, (np1, np2, pim, media) in enviadas.items():
+                            self._alunos_grades[mat] = {'np1': np1, 'np2': np2, 'pim': pim, 'media': media}
+                            self._pendentes.pop(mat, None)
+                        self._atualizar_contador_pendentes()
+                        self._avisar_salvo(f"{len(enviadas)} aluno(s) com notas atualizadas")
+                        self._atualizar_listagem_principal()
+                    else:
+                        messagebox.showerror("Erro", f"Falha ao atualizar notas: {resp}")
+                        # Recarregar do servidor para mostrar o que de fato foi gravado
+                        self.carregar_dados()
+                
+                self._em_segundo_plano(send_server_command, concluir,
+                                       f"UPDATE_NOTAS_BULK|{self.id_turma}|{lote}")
+                
+            def _avisar_salvo(self, texto):
+                """Mostra `texto` no status_label por alguns segundos, sem abrir um messagebox modal"""
+                if self._aviso_job is not None:
+                    self.dialog.after_cancel(self._aviso_job)
+                self.status_label.configure(text=f"✓ {texto}")
+                
+                def limpar():
+                    self._aviso_job = None
+                    if self.status_label.winfo_exists():
+                        self.status_label.configure(text="")
+                
+                self._aviso_job = self.dialog.after(3000, limpar)
+                
+            def _atualizar_contador_pendentes(self):
+                """Mostra no botão quantas notas aplicadas aguardam envio"""
+                botao = getattr(self, 'salvar_todas_btn', None)
+                if botao is not None:
+                    total = len(self._pendentes)
+                    botao.configure(text=f"Salvar Todas ({total})" if total else "Salvar Todas")
+                
+            def fechar(self):
+                """Fecha o dialog, confirmando se houver notas aplicadas e não salvas"""
+                if self._pendentes and not messagebox.askyesno(
+                        "Notas não salvas",
+                        f"{len(self._pendentes)} aluno(s) com notas aplicadas e não salvas.\n"
+                        "Deseja fechar e descartar essas alterações?", parent=self.dialog):
+                    return
+                self.dialog.destroy()
+                
+            def _atualizar_listagem_principal(self):
+                """Atualiza a listagem principal após salvar notas"""
+                try:
+                    self.parent._refresh_aluno_list(self.id_turma)
+                except Exception:
+                    pass
+                
             def on_select(self, event):
                 selection = self.tree.selection()
                 if not selection:
@@ -6899,80 +7818,41 @@ class App(tk.Tk):
 
                     if self.tipo_nota == "comum":
                         # Atualizar apenas notas comuns (NP1, NP2, PIM)
-                        # 1. Obtenha as notas atuais diretamente da tabela como base.
-                        np1_atual = float(valores_atuais[2])
-                        np2_atual = float(valores_atuais[3])
-                        pim_atual = float(valores_atuais[4])
-
-                        # 2. Leia o que foi digitado nos campos.
-                        np1_texto = self.nota_entries["NP1"].get().strip()
-                        np2_texto = self.nota_entries["NP2"].get().strip()
-                        pim_texto = self.nota_entries["PIM"].get().strip()
-
-                        # 3. Use o valor digitado se houver. Se não, mantenha o valor atual.
-                        np1 = float(np1_texto) if np1_texto else np1_atual
-                        np2 = float(np2_texto) if np2_texto else np2_atual
-                        pim = float(pim_texto) if pim_texto else pim_atual
-
-                        # Validar notas
-                        if not (0 <= np1 <= 10 and 0 <= np2 <= 10 and 0 <= pim <= 10):
-                            messagebox.showerror("Erro", "As notas NP1, NP2 e PIM devem estar entre 0 e 10!")
+                        notas = self._aplicar_notas_comuns(item, valores_atuais)
+                        if notas is None:
                             return
+                        np1, np2, pim, media = notas
+                        # Este aluno será salvo agora: não precisa mais ir no lote
+                        self._pendentes.pop(str(matricula), None)
+                        self._atualizar_contador_pendentes()
                         
-                        # Calcular média
-                        media = self.calcular_media(np1, np2, pim)
-                        
-                        # Atualizar valores na árvore
-                        novos_valores = (matricula, valores_atuais[1], f"{np1:.1f}", f"{np2:.1f}", f"{pim:.1f}", f"{media:.1f}")
-                        self.tree.item(item, values=novos_valores)
-                        
-                        # Envia para o servidor (notas do semestre)
-                        resp = self.parent._send_request(f"UPDATE_NOTAS|{matricula}|{np1}|{np2}|{pim}|{round(media, 1)}")
+                        def concluir(resp):
+                            # Verificar se houve sucesso
+                            if resp and "SUCESSO" in resp:
+                                # A linha já foi atualizada na árvore: basta guardar as novas notas
+                                self._alunos_grades[str(matricula)] = {'np1': np1, 'np2': np2, 'pim': pim, 'media': media}
+                                self._avisar_salvo("Notas atualizadas com sucesso")
+                                self._atualizar_listagem_principal()
+                            else:
+                                messagebox.showerror("Erro", f"Falha ao atualizar notas: {resp}")
+                                # Desfazer só esta edição, preservando as demais notas aplicadas na lista
+                                self._restaurar_linha(matricula)
                         
-                        # Verificar se houve sucesso
-                        if resp and "SUCESSO" in resp:
-                            messagebox.showinfo("Sucesso", "Notas atualizadas com sucesso!")
-                            
-                            # Recarregar os dados da tabela para mostrar as notas atualizadas
-                            self.tree.delete(*self.tree.get_children())
-                            self.carregar_dados()
-                            
-                            # Reselecionar o aluno atualizado
-                            for item in self.tree.get_children():
-                                valores = self.tree.item(item)["values"]
-                                if valores[0] == matricula:
-                                    self.tree.selection_set(item)
-                                    self.tree.focus(item)
-                                    self.tree.see(item)
-                                    break
-                        else:
-                            messagebox.showerror("Erro", f"Falha ao atualizar notas: {resp}")
+                        # Envia para o servidor (notas do semestre) sem travar a interface
+                        self._em_segundo_plano(
+                            send_server_command, concluir,
+                            f"UPDATE_NOTAS|{matricula}|{np1}|{np2}|{pim}|{round(media, 1)}"
+                        )
                     
                     else:  # exame
                         # Atualizar apenas nota de exame
-                        # Buscar as notas atuais do aluno do servidor
-                        resp_aluno = self.parent._send_request(f"LIST_ALUNOS_POR_TURMA|{self.id_turma}")
-                        np1 = np2 = pim = media = 0.0
-                        
-                        if resp_aluno and "Nenhum aluno" not in resp_aluno:
-                            for linha in resp_aluno.strip().split('\n'):
-                                if linha:
-                                    partes = linha.split(', ')
-                                    mat = partes[0].split(': ')[1]
-                                    if mat == matricula:
-                                        for p in partes[2:]:
-                                            if p.startswith('NP1:'):
-                                                np1 = float(p.split(': ')[1])
-                                            elif p.startswith('NP2:'):
-                                                np2 = float(p.split(': ')[1])
-                                            elif p.startswith('PIM:'):
-                                                pim = float(p.split(': ')[1])
-                                            elif p.startswith('Média:'):
-                                                try:
-                                                    media = float(p.split(': ')[1])
-                                                except Exception:
-                                                    media = 0.0
-                                        break
+                        # Notas atuais do aluno, já lidas do servidor em carregar_dados
+                        # (a matrícula vem da Treeview como int, daí a chave em str)
+                        notas = self._alunos_grades.get(str(matricula), {})
+                        np1 = notas.get('np1', 0.0)
+                        np2 = notas.get('np2', 0.0)
+                        pim = notas.get('pim', 0.0)
+                        media = notas.get('media', 0.0)
                         
                         # Obter nota de exame digitada
                         exame_atual = float(valores_atuais[3])
@@ -6984,20 +7864,7 @@ class App(tk.Tk):
                             messagebox.showerror("Erro", "A nota do Exame deve estar entre 0 e 10!")
                             return
                         
-                        # Calcular status com lógica correta
-                        tem_notas = (np1 > 0 or np2 > 0 or pim > 0)
-                        if not tem_notas:
-                            status = "Pendente Atribuir Notas"
-                        elif media >= 7.0:
-                            status = "Aprovado"
-                        elif media < 7.0 and exame == 0.0:
-                            status = "Pendente Exame"
-                        elif media < 7.0 and exame >= 5.0:
-                            status = "Aprovado (Exame)"
-                        elif media < 7.0 and exame < 5.0:
-                            status = "Reprovado"
-                        else:
-                            status = "Pendente"
+                        status, status_tag = status_aluno(np1, np2, pim, media, exame)
                         
                         # Atualizar valores na árvore
                         novos_valores = (matricula, valores_atuais[1], f"{media:.1f}", f"{exame:.1f}", status)
@@ -7007,35 +7874,23 @@ class App(tk.Tk):
                         try:
                             current_tags = self.tree.item(item, 'tags') or ()
                             parity = 'even' if ('even' in current_tags) or (self.tree.index(item) % 2 == 0) else 'odd'
-                            status_tag = 'aprovado' if 'Aprovado' in status else 'reprovado'
                             new_tags = (parity, status_tag)
                             self.tree.item(item, tags=new_tags)
                         except Exception:
                             pass
                         
-                        # Salvar nota de exame
-                        set_nota_exame(matricula, exame)
-                        
-                        messagebox.showinfo("Sucesso", "Nota de exame atualizada com sucesso!")
-                        
-                        # Recarregar os dados da tabela para mostrar as notas atualizadas
-                        self.tree.delete(*self.tree.get_children())
-                        self.carregar_dados()
+                        def concluir(sucesso):
+                            if sucesso:
+                                # A linha (valores e cor do status) já foi atualizada na árvore
+                                self._avisar_salvo("Nota de exame atualizada com sucesso")
+                                self._atualizar_listagem_principal()
+                            else:
+                                messagebox.showerror("Erro", "Falha ao atualizar a nota de exame.")
+                                # Desfazer a edição local recarregando os dados do servidor
+                                self.carregar_dados(ao_concluir=lambda: self._reselecionar(matricula))
                         
-                        # Reselecionar o aluno atualizado
-                        for item in self.tree.get_children():
-                            valores = self.tree.item(item)["values"]
-                            if valores[0] == matricula:
-                                self.tree.selection_set(item)
-                                self.tree.focus(item)
-                                self.tree.see(item)
-                                break
-                    
-                    # Atualizar listagem principal em background
-                    try:
-                        self.parent._refresh_aluno_list(self.id_turma)
-                    except Exception:
-                        pass
+                        # Salvar nota de exame sem travar a interface
+                        self._em_segundo_plano(set_nota_exame, concluir, matricula, exame)
                 except ValueError:
                     messagebox.showerror("Erro", "Por favor, insira apenas números válidos!")
                 except Exception as e:
@@ -7052,20 +7907,13 @@ class App(tk.Tk):
             - Visualizar presenças já registradas
         
         Características:
-            - Cabeçalho fixo (não rola com a scrollbar)
-            - Scrollbar dinâmica (só aparece quando necessário)
+            - Tabela única (Treeview) com cabeçalho fixo e scroll nativo
             - Cores visuais para status (verde=presente, vermelho=ausente)
         """
         # Solicitar seleção de turma via dropdown
         id_t = self._ask_turma_dropdown(title="Controle de Presença - Selecionar Turma")
         if not id_t: return
         
-        # Verificar se a turma existe no servidor
-        turma_resp = self._send_request(f"GET_TURMA_DATA|{id_t}")
-        if not turma_resp or "ERRO" in turma_resp:
-            messagebox.showerror("Erro", "Turma não encontrada!")
-            return
-        
         # Verificação de acesso adicional (segurança extra para professores)
         if self.role == 'professor' and not self.db.can_access_subject(self.username, id_t):
             messagebox.showerror("Acesso Negado", 
@@ -7073,6 +7921,14 @@ class App(tk.Tk):
                                f"Entre em contato com o administrador para solicitar acesso.")
             return
         
+        # Buscar os alunos da turma uma única vez: a mesma resposta confirma que a turma
+        # existe (dispensa o GET_TURMA_DATA) e serve para todas as datas escolhidas no dialog
+        resp = self._send_request(f"LIST_ALUNOS_POR_TURMA|{id_t}")
+        if not resp or resp.startswith("ERRO"):
+            messagebox.showerror("Erro", "Turma não encontrada!")
+            return
+        alunos_turma = parse_alunos_response(resp)
+        
         dialog = tk.Toplevel(self)
         dialog.configure(bg=self.colors['card'])
         _set_window_icon(dialog)
@@ -7109,7 +7965,7 @@ class App(tk.Tk):
         instructions_text = """INSTRUÇÕES DE USO:
 • Clique no ícone 📅 para selecionar uma data no calendário
 • Clique simples: seleciona a data | Duplo clique: confirma e carrega automaticamente
-• Marque os alunos presentes/ausentes clicando na coluna "Presente"
+• Dê duplo clique (ou Espaço) em um aluno para alternar Presente / Ausente / Não Registrado
 • Use os botões de ação para salvar as alterações ou fechar"""
         
         instructions_label = ttk.Label(instructions_frame, text=instructions_text, 
@@ -7189,61 +8045,95 @@ class App(tk.Tk):
                                    foreground=self.colors.get('text_secondary', self.colors['text']))
             date_display.pack()
 
+            # Cabeçalho e botões dos dias (6 semanas x 7 dias) são criados uma única vez;
+            # draw_calendar só reconfigura o texto e mostra/oculta cada botão
+            week_days = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+            for i, wd in enumerate(week_days):
+                day_header = ttk.Label(cal_body, text=wd, font=('Arial', 9, 'bold'),
+                                     foreground=self.colors.get('primary'))
+                day_header.grid(row=0, column=i, padx=3, pady=2, sticky='ew')
+            
+            # Semanas do mês exibido (tuplas de _semanas_do_mes) e botão destacado
+            grade_atual = [()]
+            destacado = [None]
+            
+            def data_do_botao(r, c):
+                """Data (DD/MM/AAAA) do botão na semana r, coluna c do mês exibido"""
+                return f"{grade_atual[0][r][c]:02d}/{sel_month.get():02d}/{sel_year.get()}"
+            
+            def on_select(r, c):
+                data = data_do_botao(r, c)
+                selected_date.set(data)
+                date_display.configure(text=f"Data selecionada: {data}")
+                # Destacar botão selecionado (e desfazer o destaque anterior)
+                if destacado[0] is not None:
+                    destacado[0].configure(bg=self.colors['card'], fg=self.colors['text'])
+                destacado[0] = day_buttons[r][c]
+                destacado[0].configure(bg=self.colors['primary_hover'], fg=self.colors['card'])
+            
+            def on_double_click(r, c):
+                """Double click confirma a data automaticamente"""
+                data = data_do_botao(r, c)
+                selected_date.set(data)
+                date_var.set(data)
+                cal_win.destroy()
+                load_for_date(data)
+            
+            day_buttons = []
+            for r in range(6):
+                linha = []
+                for c in range(7):
+                    # Botão do dia com melhor estilo
+                    day_btn = tk.Button(cal_body, font=('Arial', 9),
+                                      bg=self.colors['card'], 
+                                      fg=self.colors['text'],
+                                      activebackground=self.colors['primary_hover'],
+                                      relief='solid', bd=1,
+                                      cursor='hand2',
+                                      width=3, height=1,
+                                      command=lambda r=r, c=c: on_select(r, c))
+                    day_btn.grid(row=r + 1, column=c, padx=3, pady=2)
+                    # Adicionar double click
+                    day_btn.bind("<Double-Button-1>", lambda e, r=r, c=c: on_double_click(r, c))
+                    linha.append(day_btn)
+                day_buttons.append(linha)
+
+            # Mês já exibido e redesenho agendado (cliques seguidos em ◀/▶ viram um só)
+            desenhado = [None]
+            redesenho_pendente = [False]
+            
             def draw_calendar():
-                # Limpar widgets existentes
-                for w in cal_body.winfo_children():
-                    w.destroy()
-                    
+                redesenho_pendente[0] = False
                 y = sel_year.get()
                 m = sel_month.get()
+                if desenhado[0] == (y, m):
+                    return
+                desenhado[0] = (y, m)
                 
                 # Atualizar título do mês
                 month_label.configure(text=f"{calendar.month_name[m]} {y}")
                 
-                # Cabeçalho dos dias da semana (Brasil: Segunda a Domingo)
-                week_days = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
-                for i, wd in enumerate(week_days):
-                    day_header = ttk.Label(cal_body, text=wd, font=('Arial', 9, 'bold'),
-                                         foreground=self.colors.get('primary'))
-                    day_header.grid(row=0, column=i, padx=3, pady=2, sticky='ew')
-                
                 # Dias do mês
-                month_cal = calendar.monthcalendar(y, m)
-                for r, week in enumerate(month_cal, start=1):
-                    for c, day in enumerate(week):
-                        if day == 0:
+                grade_atual[0] = month_cal = _semanas_do_mes(y, m)
+                if destacado[0] is not None:
+                    destacado[0].configure(bg=self.colors['card'], fg=self.colors['text'])
+                    destacado[0] = None
+                for r, linha in enumerate(day_buttons):
+                    week = month_cal[r] if r < len(month_cal) else (0,) * 7
+                    for c, day_btn in enumerate(linha):
+                        if week[c] == 0:
                             # Espaço vazio para dias de outros meses
-                            ttk.Label(cal_body, text='').grid(row=r, column=c, padx=3, pady=2)
+                            day_btn.grid_remove()
                         else:
-                            def on_select(d=day):
-                                selected_date.set(f"{d:02d}/{m:02d}/{y}")
-                                date_display.configure(text=f"Data selecionada: {d:02d}/{m:02d}/{y}")
-                                # Destacar botão selecionado
-                                for widget in cal_body.winfo_children():
-                                    if isinstance(widget, tk.Button) and widget['text'] == str(d):
-                                        widget.configure(bg=self.colors['primary_hover'], fg=self.colors['card'])
-                            
-                            def on_double_click(d=day):
-                                """Double click confirma a data automaticamente"""
-                                selected_date.set(f"{d:02d}/{m:02d}/{y}")
-                                date_var.set(f"{d:02d}/{m:02d}/{y}")
-                                cal_win.destroy()
-                                load_for_date(f"{d:02d}/{m:02d}/{y}")
-                            
-                            # Botão do dia com melhor estilo
-                            day_btn = tk.Button(cal_body, text=str(day), 
-                                              font=('Arial', 9),
-                                              bg=self.colors['card'], 
-                                              fg=self.colors['text'],
-                                              activebackground=self.colors['primary_hover'],
-                                              relief='solid', bd=1,
-                                              cursor='hand2',
-                                              width=3, height=1)
-                            day_btn.grid(row=r, column=c, padx=3, pady=2)
-                            day_btn.configure(command=on_select)
-                            # Adicionar double click
-                            day_btn.bind("<Double-Button-1>", lambda e, d=day: on_double_click(d))
+                            day_btn.configure(text=str(week[c]))
+                            day_btn.grid()
 
+            def agendar_redesenho():
+                """Redesenha quando o Tk ficar ocioso, uma vez só para vários cliques seguidos"""
+                if not redesenho_pendente[0]:
+                    redesenho_pendente[0] = True
+                    cal_win.after_idle(draw_calendar)
+            
             # Configurar navegação
             def prev_month():
                 if sel_month.get() == 1:
@@ -7251,7 +8141,7 @@ class App(tk.Tk):
                     sel_year.set(sel_year.get() - 1)
                 else:
                     sel_month.set(sel_month.get() - 1)
-                draw_calendar()
+                agendar_redesenho()
                 
             def next_month():
                 if sel_month.get() == 12:
@@ -7259,7 +8149,7 @@ class App(tk.Tk):
                     sel_year.set(sel_year.get() + 1)
                 else:
                     sel_month.set(sel_month.get() + 1)
-                draw_calendar()
+                agendar_redesenho()
             
             prev_btn.configure(command=prev_month)
             next_btn.configure(command=next_month)
@@ -7317,88 +8207,60 @@ class App(tk.Tk):
         # SEÇÃO DE LISTA DE PRESENÇA
         # ==============================================================================
         
-        # Container principal para lista (contém header + dados scrollable)
-        list_container = ttk.Frame(main_frame)
-        list_container.pack(fill=tk.BOTH, expand=True)
-        
-        # IMPORTANTE: Cabeçalho fica FORA do canvas scrollable para permanecer fixo no topo
-        # Isso evita que o cabeçalho role junto com os dados
-        header_frame = tk.Frame(list_container, bg=self.colors['primary'], relief='solid', bd=1)
-        header_frame.pack(fill=tk.X, pady=(0, 2))
-        
-        # Colunas do cabeçalho
-        tk.Label(header_frame, text="Matrícula", font=('Arial', 10, 'bold'), 
-                bg=self.colors['primary'], fg=self.colors['card'], width=12).pack(side=tk.LEFT, padx=5, pady=8)
-        tk.Label(header_frame, text="Nome", font=('Arial', 10, 'bold'), 
-                bg=self.colors['primary'], fg=self.colors['card'], width=30).pack(side=tk.LEFT, padx=5, pady=8)
-        tk.Label(header_frame, text="Presença", font=('Arial', 10, 'bold'), 
-                bg=self.colors['primary'], fg=self.colors['card'], width=15).pack(side=tk.LEFT, padx=5, pady=8)
-        
-        # Frame que contém canvas + scrollbar (para os dados dos alunos)
-        list_frame = ttk.Frame(list_container)
+        # Uma única Treeview (cabeçalho fixo e scroll nativos) em vez de um frame com
+        # labels e combobox por aluno: trocar de data só reescreve os valores das linhas
+        list_frame = ttk.Frame(main_frame)
         list_frame.pack(fill=tk.BOTH, expand=True)
-
-        # Canvas com scrollbar dinâmica para suportar muitos alunos
-        canvas_list = tk.Canvas(list_frame, bg=self.colors['card'], highlightthickness=0)
-        scrollbar_list = ttk.Scrollbar(list_frame, orient="vertical", command=canvas_list.yview)
-        scrollable_list = tk.Frame(canvas_list, bg=self.colors['card'])
         
-        # Criar janela dentro do canvas para conter o frame scrollable
-        canvas_window_list = canvas_list.create_window((0, 0), window=scrollable_list, anchor="nw")
-        canvas_list.configure(yscrollcommand=scrollbar_list.set)
+        tree = ttk.Treeview(list_frame, columns=("Matrícula", "Nome", "Presença"),
+                            show="headings", style="Custom.Treeview")
+        tree.heading("Matrícula", text="Matrícula")
+        tree.heading("Nome", text="Nome")
+        tree.heading("Presença", text="Presença")
+        tree.column("Matrícula", width=120, anchor=tk.CENTER)
+        tree.column("Nome", width=300, anchor='w')
+        tree.column("Presença", width=150, anchor=tk.CENTER)
+        
+        scrollbar_list = ttk.Scrollbar(list_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar_list.set)
+        scrollbar_list.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
-        def update_scroll_list(event=None):
-            """
-            Atualiza a scrollregion e controla a visibilidade da scrollbar
-            
-            IMPORTANTE: A scrollbar só aparece quando há mais conteúdo do que a área visível
-            Isso previne o problema de scroll indevido quando há poucos dados
-            """
-            # Atualizar todas as geometrias pendentes
-            canvas_list.update_idletasks()
-            
-            # Obter bounding box de todo o conteúdo
-            bbox = canvas_list.bbox("all")
-            if bbox:
-                # Configurar região scrollable
-                canvas_list.configure(scrollregion=bbox)
-                
-                # Calcular se o conteúdo é maior que a área visível
-                content_height = bbox[3] - bbox[1]  # Altura total do conteúdo
-                canvas_height = canvas_list.winfo_height()  # Altura visível do canvas
-                
-                # Mostrar/ocultar scrollbar baseado na necessidade real
-                if content_height > canvas_height:
-                    # Conteúdo maior que área visível: mostrar scrollbar
-                    if not scrollbar_list.winfo_viewable():
-                        scrollbar_list.pack(side=tk.RIGHT, fill=tk.Y)
-                else:
-                    # Conteúdo cabe na área visível: ocultar scrollbar
-                    if scrollbar_list.winfo_viewable():
-                        scrollbar_list.pack_forget()
-                    # Garantir que canvas está no topo (sem deslocamento)
-                    canvas_list.yview_moveto(0)
-        
-        def on_canvas_configure_list(event):
-            """Ajusta largura do conteúdo e verifica necessidade de scrollbar"""
-            # Ajustar largura do frame interno para preencher o canvas
-            canvas_list.itemconfig(canvas_window_list, width=event.width)
-            # Verificar se scrollbar é necessária após redimensionamento
-            update_scroll_list()
-        
-        # Vincular eventos de mudança de tamanho
-        scrollable_list.bind("<Configure>", update_scroll_list)  # Quando conteúdo muda
-        canvas_list.bind("<Configure>", on_canvas_configure_list)  # Quando canvas redimensiona
-        
-        # Empacotar canvas (scrollbar será empacotada dinamicamente se necessário)
-        canvas_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        # NOTA: scrollbar NÃO é empacotada aqui - será feito dinamicamente pela função update_scroll_list
-
-        # Buscar lista de alunos da turma do servidor
-        resp = self._send_request(f"LIST_ALUNOS_POR_TURMA|{id_t}")
+        # Cores por status (mesmas de "Minhas Presenças")
+        if getattr(self, 'dark_mode', False):
+            tree.tag_configure('presente', background='#1B4D3E', foreground='#B8F4D6')
+            tree.tag_configure('ausente', background='#4D1B1B', foreground='#FFB3B3')
+        else:
+            tree.tag_configure('presente', background='#e8f5e9', foreground='#1B5E20')
+            tree.tag_configure('ausente', background='#ffebee', foreground='#C62828')
+        tree.tag_configure('nao_registrado', background=self.colors['card'], foreground=self.colors['text'])
+        
+        # Status exibido -> tag de cor, e a ordem em que o duplo clique alterna entre eles
+        tags_status = {"Presente": 'presente', "Ausente": 'ausente', "Não Registrado": 'nao_registrado'}
+        proximo_status = {"Presente": "Ausente", "Ausente": "Não Registrado", "Não Registrado": "Presente"}
         
-        # Dicionário para armazenar os comboboxes de presença (matricula -> StringVar)
-        presenca_combos = {}
+        # Status de presença atual de cada aluno na tabela (matricula -> "Presente"/"Ausente"/"Não Registrado")
+        presenca_status = {}
+        
+        # Presenças da turma lidas uma vez e indexadas por data:
+        # data -> {matricula (int): presente (bool)}
+        presenca_por_data = collections.defaultdict(dict)
+        try:
+            for r in read_presencas_dat(id_t):
+                presenca_por_data[r.get('date')][int(r.get('matricula'))] = r.get('presente', False)
+        except Exception:
+            presenca_por_data.clear()
+        
+        # As linhas dos alunos são criadas uma vez (iid = matrícula); cada data só muda status e cor
+        for aluno in alunos_turma:
+            tree.insert("", tk.END, iid=aluno['matricula'],
+                        values=(aluno['matricula'], aluno['nome'], "Não Registrado"))
+
+        def definir_status(matricula, status):
+            """Atualiza o status de presença de um aluno na tabela (valor e cor)"""
+            presenca_status[matricula] = status
+            tree.set(matricula, "Presença", status)
+            tree.item(matricula, tags=(tags_status[status],))
 
         def load_for_date(date_str):
             """
@@ -7408,92 +8270,27 @@ class App(tk.Tk):
                 date_str: Data no formato DD/MM/YYYY
             
             Comportamento:
-                - Limpa dados anteriores (header fica intacto pois está fora do scrollable_list)
                 - Carrega registros de presença salvos para a data
                 - Exibe alunos com cores baseadas no status (verde/vermelho/neutro)
-                - Atualiza scrollbar dinamicamente
             """
-            # Limpar linhas anteriores (header está fora do scrollable_list, então não é afetado)
-            for widget in scrollable_list.winfo_children():
-                widget.destroy()
-            
-            # Limpar dicionário de comboboxes
-            presenca_combos.clear()
-            
-            # Build a dict of presence status for the date
-            presenca_dict = {}  # matricula -> True (presente), False (ausente), None (não registrado)
-            try:
-                records = read_presencas_dat(id_t)
-                for r in records:
-                    if r.get('date') == date_str:
-                        presenca_dict[int(r.get('matricula'))] = r.get('presente', False)
-            except Exception:
-                presenca_dict = {}
-
-            if resp and "Nenhum aluno" not in resp:
-                for i, linha in enumerate(resp.strip().split('\n')):
-                    if linha:
-                        partes = linha.split(', ')
-                        matricula = partes[0].split(': ')[1]
-                        nome = partes[1].split(': ')[1]
-                        
-                        # Determinar status de presença
-                        mat_int = int(matricula)
-                        if mat_int in presenca_dict:
-                            if presenca_dict[mat_int]:
-                                status_inicial = "Presente"
-                                bg_color = '#e8f5e9' if not getattr(self, 'dark_mode', False) else '#1B4D3E'
-                            else:
-                                status_inicial = "Ausente"
-                                bg_color = '#ffebee' if not getattr(self, 'dark_mode', False) else '#4D1B1B'
-                        else:
-                            status_inicial = "Não Registrado"
-                            bg_color = self.colors['card']
-                        
-                        # Criar linha para o aluno
-                        aluno_frame = tk.Frame(scrollable_list, bg=bg_color, relief='solid', bd=1)
-                        aluno_frame.pack(fill=tk.X, pady=1)
-                        
-                        # Matrícula
-                        tk.Label(aluno_frame, text=matricula, font=('Arial', 10), 
-                                bg=bg_color, fg=self.colors['text'], width=12).pack(side=tk.LEFT, padx=5, pady=8)
-                        
-                        # Nome
-                        tk.Label(aluno_frame, text=nome, font=('Arial', 10), 
-                                bg=bg_color, fg=self.colors['text'], width=30, anchor='w').pack(side=tk.LEFT, padx=5, pady=8)
-                        
-                        # Menu suspenso de presença
-                        presenca_var = tk.StringVar(value=status_inicial)
-                        presenca_combo = ttk.Combobox(aluno_frame, textvariable=presenca_var,
-                                                     values=["Presente", "Ausente", "Não Registrado"],
-                                                     state="readonly", width=18, font=('Arial', 9))
-                        presenca_combo.pack(side=tk.LEFT, padx=5, pady=5)
-                        
-                        # Guardar referência com matrícula
-                        presenca_combos[matricula] = presenca_var
-                        
-                        # Mudar cor do frame quando mudar presença
-                        def on_presenca_change(event, frame=aluno_frame, var=presenca_var):
-                            status = var.get()
-                            if status == "Presente":
-                                new_bg = '#e8f5e9' if not getattr(self, 'dark_mode', False) else '#1B4D3E'
-                            elif status == "Ausente":
-                                new_bg = '#ffebee' if not getattr(self, 'dark_mode', False) else '#4D1B1B'
-                            else:
-                                new_bg = self.colors['card']
-                            
-                            frame.config(bg=new_bg)
-                            for child in frame.winfo_children():
-                                if isinstance(child, tk.Label):
-                                    child.config(bg=new_bg)
-                        
-                        presenca_combo.bind('<<ComboboxSelected>>', on_presenca_change)
-            
-            # Atualizar scrollregion após carregar todos os dados
-            # Usar a função que controla a visibilidade da scrollbar
-            scrollable_list.update_idletasks()
-            canvas_list.update_idletasks()
-            update_scroll_list()
+            # matricula -> True (presente), False (ausente); ausente do dict = não registrado
+            presenca_dict = presenca_por_data.get(date_str, {})
+            
+            for aluno in alunos_turma:
+                matricula = aluno['matricula']
+                presente = presenca_dict.get(int(matricula))
+                if presente is None:
+                    definir_status(matricula, "Não Registrado")
+                else:
+                    definir_status(matricula, "Presente" if presente else "Ausente")
+
+        def alternar_presenca(item):
+            """Alterna a presença do aluno: Presente -> Ausente -> Não Registrado"""
+            if item:
+                definir_status(item, proximo_status[presenca_status[item]])
+        
+        tree.bind('<Double-1>', lambda e: alternar_presenca(tree.identify_row(e.y)))
+        tree.bind('<space>', lambda e: alternar_presenca(tree.focus()))
 
         # Carregar presenças da data atual ao abrir
         load_for_date(date_var.get())
@@ -7506,14 +8303,12 @@ class App(tk.Tk):
                 - Coleta status de presença de todos os alunos
                 - Ignora alunos marcados como "Não Registrado"
                 - Salva em arquivo .dat específico da turma
-                - Recarrega dados para atualizar cores visuais
             """
             data = date_var.get()
             presencas = []
             
-            # Iterar por todos os comboboxes de presença
-            for matricula, presenca_var in presenca_combos.items():
-                status = presenca_var.get()
+            # Iterar pelo status de todos os alunos da tabela
+            for matricula, status in presenca_status.items():
                 
                 # Só salvar se houver um registro definido (Presente ou Ausente)
                 if status != "Não Registrado":
@@ -7525,8 +8320,10 @@ class App(tk.Tk):
             # Salvar registros no arquivo .dat da turma
             ok = save_presencas_dat(id_t, data, presencas)
             if ok:
+                # Manter o índice em memória igual ao arquivo, sem relê-lo
+                for p in presencas:
+                    presenca_por_data[data][int(p['matricula'])] = p['presente']
                 messagebox.showinfo("Sucesso", f"Presenças salvas para {data}!")
-                load_for_date(data)  # Recarregar para atualizar cores dos frames
             else:
                 messagebox.showerror("Erro", "Falha ao salvar presenças")
 
@@ -7542,9 +8339,6 @@ class App(tk.Tk):
         
         # Configurar atalhos (ESC fecha)
         _setup_dialog_shortcuts(dialog, ok_button=save_btn, cancel_callback=dialog.destroy)
-        
-        # Habilitar scroll com mousewheel no canvas
-        _enable_canvas_scroll(canvas_list, scrollable_list)
 
     def upload_atividade(self):
         id_t = self._ask_turma_dropdown(title="Upload de Atividade - Selecionar Turma")
@@ -7559,15 +8353,26 @@ class App(tk.Tk):
         
         f_path = filedialog.askopenfilename(title="Selecionar arquivo")
         if not f_path: return
-        try:
-            f_size=os.path.getsize(f_path); f_name=os.path.basename(f_path)
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.connect((HOST,PORT)); s.sendall(f"UPLOAD_FILE|{id_t}|{f_name}|{f_size}".encode('utf-8'))
-                if s.recv(1024)==b"OK_SEND_DATA":
-                    with open(f_path,"rb") as f:
-                        while (chunk := f.read(4096)): s.sendall(chunk)
-                    fin_resp=s.recv(1024).decode('utf-8'); messagebox.showinfo("Upload",fin_resp)
-        except Exception as e: messagebox.showerror("Erro Upload", f"Ocorreu um erro: {e}")
+        
+        def entregar(fin_resp, erro):
+            # Executa na thread do Tk
+            if erro is not None:
+                messagebox.showerror("Erro Upload", f"Ocorreu um erro: {erro}")
+            elif fin_resp is not None:
+                messagebox.showinfo("Upload", fin_resp)
+        
+        def concluido(fut):
+            try:
+                fin_resp, erro = fut.result(), None
+            except Exception as e:
+                fin_resp, erro = None, e
+            try:
+                self.after(0, entregar, fin_resp, erro)
+            except Exception:
+                pass  # Janela principal já foi fechada
+        
+        # O envio roda no _transfer_pool para arquivos grandes não congelarem a interface
+        self._transfer_pool.submit(enviar_arquivo_servidor, id_t, f_path).add_done_callback(concluido)
 
     def listar_atividades(self):
         # Para alunos, mostrar apenas atividades da sua turma
@@ -7577,26 +8382,8 @@ class App(tk.Tk):
                 messagebox.showerror("Erro", "Você não possui uma matrícula associada. Entre em contato com o administrador.")
                 return
             
-            # Encontrar turma do aluno
-            resp_list = self._send_request(f"LIST_TURMAS")
-            if not resp_list or "Nenhuma turma" in resp_list:
-                messagebox.showerror("Erro", "Nenhuma turma encontrada.")
-                return
-            
-            id_t = None
-            for linha in resp_list.strip().split('\n'):
-                if linha:
-                    partes = linha.split(', ')
-                    tid = partes[0].split(': ')[1]
-                    
-                    alunos_resp = self._send_request(f"LIST_ALUNOS_POR_TURMA|{tid}")
-                    if alunos_resp and "Nenhum aluno" not in alunos_resp:
-                        for aluno_linha in alunos_resp.strip().split('\n'):
-                            if aluno_linha and f"Matrícula: {matricula}" in aluno_linha:
-                                id_t = tid
-                                break
-                    if id_t:
-                        break
+            # Encontrar turma do aluno (uma única consulta ao servidor)
+            id_t, _ = self._get_turma_do_aluno(matricula)
             
             if not id_t:
                 messagebox.showerror("Erro", "Sua turma não foi encontrada.")
@@ -7613,87 +8400,55 @@ class App(tk.Tk):
                                    f"Entre em contato com o administrador para solicitar acesso.")
                 return
         
-        # Primeiro, busca os dados da turma
-        turma_resp = self._send_request(f"GET_TURMA_DATA|{id_t}")
-        if not turma_resp or "ERRO" in turma_resp:
-            messagebox.showerror("Erro", "Turma não encontrada")
-            return
-            
-        disc, _ = turma_resp.split('|')
-        
-        resp = self._send_request(f"LIST_FILES|{id_t}")
-        if resp is not None:
-            if "Nenhuma atividade" in resp:
-                self._update_display(
-                    f"Atividades da Turma {id_t} - {disc}",
-                    ["Nome do Arquivo", "Data de Envio", "Tamanho", "Ações"],
-                    []
-                )
-            else:
-                arquivos_data = []
-                for arquivo in resp.strip().split('\n'):
-                    if arquivo:
-                        # Extrai timestamp do nome do arquivo (assumindo o formato timestamp_nome.ext)
-                        try:
-                            timestamp = int(arquivo.split('_')[0])
-                            nome = '_'.join(arquivo.split('_')[1:])
-                            data = time.strftime('%d/%m/%Y %H:%M', time.localtime(timestamp))
-                            
-                            # Busca informações do arquivo
-                            arquivo_path = os.path.join('uploads', f'turma_{id_t}', arquivo)
-                            if os.path.exists(arquivo_path):
-                                tamanho = os.path.getsize(arquivo_path)
-                                if tamanho < 1024:
-                                    tamanho_str = f"{tamanho} B"
-                                elif tamanho < 1024*1024:
-                                    tamanho_str = f"{tamanho/1024:.1f} KB"
-                                else:
-                                    tamanho_str = f"{tamanho/(1024*1024):.1f} MB"
-                            else:
-                                tamanho_str = "N/A"
-                            
-                        except:
-                            nome = arquivo
-                            data = "N/A"
-                            tamanho_str = "N/A"
-                            
-                        arquivos_data.append([nome, data, tamanho_str, "⬇️ Baixar"])
-                
+        # As duas requisições rodam fora da thread do Tk; a tela é montada ao chegar a resposta
+        def exibir_arquivos(disc, resp):
+            if resp is not None:
+                arquivos = parse_arquivos_response(resp)
+                arquivos_data = [
+                    [d['name'],
+                     time.strftime('%d/%m/%Y %H:%M', time.localtime(d['mtime'])) if d['mtime'] is not None else "N/A",
+                     _tamanho_legivel(d['size']) if d['size'] is not None else "N/A",
+                     "⬇️ Baixar"]
+                    for d in arquivos
+                ]
+                # Cada linha é identificada pelo nome do arquivo no servidor (único), não pelo texto exibido
                 self._update_display(
                     f"Atividades da Turma {id_t} - {disc}",
                     ["Nome do Arquivo", "Data de Envio", "Tamanho", "Ações"],
-                    arquivos_data
+                    arquivos_data,
+                    iids=[d['orig'] for d in arquivos]
                 )
                 
                 # Configurar clique no botão de download
-                if hasattr(self, 'display_tree'):
+                if arquivos_data and hasattr(self, 'display_tree'):
                     self.display_tree.bind('<Double-Button-1>', lambda e: self._download_arquivo(e, id_t))
+
+        def receber_turma(turma_resp):
+            # Primeiro, os dados da turma
+            if not turma_resp or "ERRO" in turma_resp:
+                messagebox.showerror("Erro", "Turma não encontrada")
+                return
+            disc, _, _ = turma_resp.partition('|')
+            # Em cache: _download_arquivo reaproveita esta mesma resposta para achar o arquivo
+            self._send_request_async(f"LIST_FILES_V2|{id_t}", lambda resp: exibir_arquivos(disc, resp),
+                                     cached=True, ttl=PREFETCH_CACHE_TTL)
+        
+        self._send_request_async(f"GET_TURMA_DATA|{id_t}", receber_turma, cached=True)
                     
     def _download_arquivo(self, event, id_turma):
         item = self.display_tree.selection()
         if not item:
             return
             
-        valores = self.display_tree.item(item[0])['values']
-        if not valores:
+        # O iid da linha é o nome do arquivo no servidor; confere na mesma listagem (em cache)
+        # usada para montar a tabela e obtém dela o nome exibido
+        arquivo_original = item[0]
+        arquivos = self._send_request_parsed(f"LIST_FILES_V2|{id_turma}", parse_arquivos_response,
+                                             ttl=PREFETCH_CACHE_TTL)
+        if not arquivos:
             return
-            
-        nome_arquivo = valores[0]
+        nome_arquivo = next((d['name'] for d in arquivos if d['orig'] == arquivo_original), None)
         if not nome_arquivo:
-            return
-            
-        # Busca o nome original do arquivo
-        resp = self._send_request(f"LIST_FILES|{id_turma}")
-        if not resp or "Nenhuma atividade" in resp:
-            return
-            
-        arquivo_original = None
-        for arquivo in resp.strip().split('\n'):
-            if arquivo and nome_arquivo in arquivo:
-                arquivo_original = arquivo
-                break
-                
-        if not arquivo_original:
             messagebox.showerror("Erro", "Arquivo não encontrado no servidor")
             return
             
@@ -7703,29 +8458,31 @@ class App(tk.Tk):
             title="Salvar Como"
         )
         
-        if save_path:
+        if not save_path:
+            return
+        
+        def entregar(erro_servidor, erro):
+            # Executa na thread do Tk
+            if erro is not None:
+                messagebox.showerror("Erro", f"Erro ao baixar arquivo: {erro}")
+            elif erro_servidor:
+                messagebox.showerror("Erro", erro_servidor)
+            else:
+                messagebox.showinfo("Sucesso", f"Arquivo {nome_arquivo} baixado com sucesso!")
+        
+        def concluido(fut):
             try:
-                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                    s.connect((HOST, PORT))
-                    s.sendall(f"DOWNLOAD_FILE|{id_turma}|{arquivo_original}".encode('utf-8'))
-                    response = s.recv(1024).decode('utf-8')
-                    
-                    if "ERRO" in response:
-                        messagebox.showerror("Erro", response)
-                        return
-                    
-                    if response.startswith("OK_DOWNLOAD"):
-                        filesize = int(response.split("|")[1])
-                        with open(save_path, "wb") as f:
-                            bytes_received = 0
-                            while bytes_received < filesize:
-                                chunk = s.recv(min(4096, filesize - bytes_received))
-                                if not chunk: break
-                                f.write(chunk)
-                                bytes_received += len(chunk)
-                        messagebox.showinfo("Sucesso", "Arquivo baixado com sucesso!")
+                erro_servidor, erro = fut.result(), None
             except Exception as e:
-                messagebox.showerror("Erro", f"Erro ao baixar arquivo: {e}")
+                erro_servidor, erro = None, e
+            try:
+                self.after(0, entregar, erro_servidor, erro)
+            except Exception:
+                pass  # Janela principal já foi fechada
+        
+        # Cada download roda no _transfer_pool em conexão própria: vários arquivos podem ser
+        # baixados ao mesmo tempo sem travar a interface
+        self._transfer_pool.submit(baixar_arquivo_servidor, id_turma, arquivo_original, save_path).add_done_callback(concluido)
 
     def aprovar_cadastros(self):
         """Interface para admin aprovar/rejeitar cadastros pendentes"""
@@ -7735,12 +8492,6 @@ class App(tk.Tk):
         
         pending_users = self.db.get_pending_users()
         
-        # DEBUG: Verificar o que está sendo retornado
-        print(f"[DEBUG] Total de usuários no sistema: {len(self.db.users)}")
-        print(f"[DEBUG] Usuários pendentes encontrados: {len(pending_users)}")
-        for user in self.db.users.values():
-            print(f"[DEBUG] Usuário: {user.get('role', 'N/A')}, Status: {user.get('status', 'N/A')}")
-        
         if not pending_users:
             messagebox.showinfo("Informação", "Não há cadastros pendentes de aprovação.")
             return
@@ -7775,79 +8526,42 @@ class App(tk.Tk):
         tk.Label(main_frame, text="⏳ Cadastros Pendentes de Aprovação", 
                 font=('Arial', 16, 'bold'), bg=self.colors['card'], fg=self.colors['primary']).pack(pady=(0, 15))
         
-        # Frame scrollável para lista de usuários
-        canvas = tk.Canvas(main_frame, bg=self.colors['card'], highlightthickness=0)
-        scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg=self.colors['card'])
+        # Lista de usuários: uma Treeview (uma linha por cadastro) em vez de um frame com
+        # labels e botões por usuário; aprovar/rejeitar só remove a linha
+        columns = ("Usuário", "Email", "Tipo", "Turno", "Matrícula", "Aguardando")
+        tree_frame = tk.Frame(main_frame, bg=self.colors['card'])
+        tree = ttk.Treeview(tree_frame, columns=columns, show="headings", style="Custom.Treeview",
+                            selectmode='browse')
+        for col, largura in zip(columns, (110, 190, 80, 110, 90, 110)):
+            tree.heading(col, text=col)
+            tree.column(col, width=largura, anchor='w')
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
         
-        # Criar a janela no canvas
-        canvas_window = canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
+        # Cor do tempo de espera baseada na urgência
+        tree.tag_configure('urgente', foreground='#F44336')   # Vermelho - 3 dias ou mais
+        tree.tag_configure('atencao', foreground='#FF9800')   # Laranja - 1 dia ou mais
         
-        def update_scroll_consolidado(event=None):
-            canvas.configure(scrollregion=canvas.bbox("all"))
-            self._manage_scrollbar_visibility(canvas, scrollbar, scrollable_frame)
+        turno_icones = {'matutino': '', 'vespertino': '', 'noturno': ''}
         
-        def on_canvas_configure(event):
-            # Ajustar largura do scrollable_frame para preencher o canvas
-            canvas.itemconfig(canvas_window, width=event.width)
-
-        scrollable_frame.bind("<Configure>", update_scroll_consolidado)
-        canvas.bind("<Configure>", on_canvas_configure)
-        
-        def refresh_list():
+        def refresh_list(pending):
             # Limpar lista
-            for widget in scrollable_frame.winfo_children():
-                widget.destroy()
-            
-            pending = self.db.get_pending_users()
-            
-            # DEBUG: Verificar na atualização da lista
-            print(f"[DEBUG refresh_list] Usuários pendentes: {len(pending)}")
-            for p in pending:
-                print(f"[DEBUG refresh_list] - {p['username']}: {p['role']}")
-            
-            if not pending:
-                tk.Label(scrollable_frame, text="Nenhum cadastro pendente", 
-                        bg=self.colors['card'], fg=self.colors['text']).pack(pady=20)
-                return
+            tree.delete(*tree.get_children())
             
+            # Mesmo instante de referência para todos os cadastros da lista
+            now = datetime.now()
             for user in pending:
-                # Buscar dados completos do usuário para pegar matrícula
-                user_data = self.db.get_user_data(user['username'])
-                matricula = user_data.get('matricula') if user_data else None
-                
-                user_frame = tk.Frame(scrollable_frame, bg=self.colors['card'], relief='solid', bd=1)
-                user_frame.pack(fill=tk.X, pady=5, padx=5)
-                
-                info_frame = tk.Frame(user_frame, bg=self.colors['card'])
-                info_frame.pack(fill=tk.X, padx=10, pady=10)
-                
-                tk.Label(info_frame, text=f"{user['username']}", 
-                        font=('Arial', 12, 'bold'), bg=self.colors['card'], fg=self.colors['text']).pack(anchor='w')
-                tk.Label(info_frame, text=f"{user['email']}", 
-                        font=('Arial', 10), bg=self.colors['card'], fg=self.colors['text']).pack(anchor='w')
-                tk.Label(info_frame, text=f"Tipo: {user['role'].title()}", 
-                        font=('Arial', 10), bg=self.colors['card'], fg=self.colors['text']).pack(anchor='w')
+                matricula = user['matricula']
                 
                 # Exibir turno
-                turno = user_data.get('turno', 'Não definido')
-                turno_icone = {'matutino': '', 'vespertino': '', 'noturno': ''}.get(turno, '🕐')
-                tk.Label(info_frame, text=f"{turno_icone} Turno: {turno.title()}", 
-                        font=('Arial', 10), bg=self.colors['card'], fg=self.colors['text']).pack(anchor='w')
-                
-                # Exibir matrícula se for aluno
-                if user['role'] == 'aluno' and matricula:
-                    tk.Label(info_frame, text=f"Matrícula: {matricula}", 
-                            font=('Arial', 10, 'bold'), bg=self.colors['card'], 
-                            fg=self.colors['primary']).pack(anchor='w', pady=(5, 0))
+                turno = user['turno']
+                turno_icone = turno_icones.get(turno, '🕐')
                 
-                # Calcular e exibir tempo desde o cadastro
+                # Calcular tempo desde o cadastro
+                tempo_texto, tag = "", ()
                 if user.get('created_at'):
                     try:
-                        from datetime import datetime
                         created_dt = datetime.fromisoformat(user['created_at'])
-                        now = datetime.now()
                         delta = now - created_dt
                         
                         if delta.days > 0:
@@ -7863,55 +8577,88 @@ class App(tk.Tk):
                         
                         # Cor baseada na urgência
                         if delta.days >= 3:
-                            tempo_cor = '#F44336'  # Vermelho - urgente
+                            tag = ('urgente',)
                         elif delta.days >= 1:
-                            tempo_cor = '#FF9800'  # Laranja - atenção
-                        else:
-                            tempo_cor = self.colors['text_secondary']  # Cinza - recente
-                        
-                        tk.Label(info_frame, text=f"Aguardando: {tempo_texto}", 
-                                font=('Arial', 9, 'italic'), bg=self.colors['card'], 
-                                fg=tempo_cor).pack(anchor='w', pady=(3, 0))
+                            tag = ('atencao',)
                     except Exception:
                         pass
                 
-                # Botões de ação
-                btn_frame = tk.Frame(user_frame, bg=self.colors['card'])
-                btn_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
-                
-                def approve(u=user['username']):
-                    success, msg = self.db.approve_user(u)
-                    if success:
-                        messagebox.showinfo("Sucesso", msg)
-                        refresh_list()
-                        self._refresh_pending_notification()  # Atualizar notificação na sidebar
-                    else:
-                        messagebox.showerror("Erro", msg)
-                
-                def reject(u=user['username']):
-                    if messagebox.askyesno("Confirmar", f"Deseja realmente rejeitar o cadastro de '{u}'?"):
-                        success, msg = self.db.reject_user(u)
-                        if success:
-                            messagebox.showinfo("Sucesso", msg)
-                            refresh_list()
-                            self._refresh_pending_notification()  # Atualizar notificação na sidebar
-                        else:
-                            messagebox.showerror("Erro", msg)
-                
-                ttk.Button(btn_frame, text="Aprovar", command=approve,
-                          style='Success.TButton').pack(side=tk.LEFT, padx=(0, 10))
-                ttk.Button(btn_frame, text="Rejeitar", command=reject,
-                          style='Danger.TButton').pack(side=tk.LEFT)
-                scrollable_frame.after(50, update_scroll_consolidado)
+                # Matrícula só para alunos
+                tree.insert("", tk.END, iid=user['username'], tags=tag, values=(
+                    user['username'], user['email'], user['role'].title(),
+                    f"{turno_icone} {turno.title()}",
+                    matricula if user['role'] == 'aluno' and matricula else "",
+                    tempo_texto))
+            
+            children = tree.get_children()
+            if children:
+                tree.selection_set(children[0])
+                tree.focus(children[0])
+        
+        def usuario_selecionado():
+            selecao = tree.selection()
+            if not selecao:
+                messagebox.showwarning("Aviso", "Selecione um cadastro primeiro!", parent=dialog)
+                return None
+            return selecao[0]
+        
+        def remover_linha(u):
+            """Remove o cadastro já tratado da lista e seleciona o próximo"""
+            proximo = tree.next(u) or tree.prev(u)
+            tree.delete(u)
+            if proximo:
+                tree.selection_set(proximo)
+                tree.focus(proximo)
+            elif not tree.get_children():
+                # Último cadastro tratado: trocar a tabela vazia pelo aviso
+                tree.pack_forget()
+                scrollbar.pack_forget()
+                tk.Label(tree_frame, text="Nenhum cadastro pendente", 
+                        bg=self.colors['card'], fg=self.colors['text']).pack(pady=20)
+                approve_btn.config(state='disabled')
+                reject_btn.config(state='disabled')
+            self._refresh_pending_notification()  # Atualizar notificação na sidebar
         
-        refresh_list()
+        def approve():
+            u = usuario_selecionado()
+            if not u:
+                return
+            success, msg = self.db.approve_user(u)
+            if success:
+                messagebox.showinfo("Sucesso", msg)
+                remover_linha(u)
+            else:
+                messagebox.showerror("Erro", msg)
         
-        # Configurar scrollbar
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y", pady=(0, 15))
+        def reject():
+            u = usuario_selecionado()
+            if not u:
+                return
+            if messagebox.askyesno("Confirmar", f"Deseja realmente rejeitar o cadastro de '{u}'?"):
+                success, msg = self.db.reject_user(u)
+                if success:
+                    messagebox.showinfo("Sucesso", msg)
+                    remover_linha(u)
+                else:
+                    messagebox.showerror("Erro", msg)
         
-        # Habilitar scroll com o mouse
-        _enable_canvas_scroll(canvas, scrollable_frame)
+        # Botões de ação (operam sobre o cadastro selecionado)
+        action_frame = tk.Frame(main_frame, bg=self.colors['card'])
+        action_frame.pack(fill=tk.X, pady=(0, 10))
+        approve_btn = ttk.Button(action_frame, text="Aprovar", command=approve,
+                                 style='Success.TButton')
+        approve_btn.pack(side=tk.LEFT, padx=(0, 10))
+        reject_btn = ttk.Button(action_frame, text="Rejeitar", command=reject,
+                                style='Danger.TButton')
+        reject_btn.pack(side=tk.LEFT)
+        
+        # A lista já buscada para verificar se há pendentes serve para o primeiro preenchimento
+        refresh_list(pending_users)
+        
+        # Configurar scrollbar
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
         
         # Botão fechar na parte inferior
         btn_frame = ttk.Frame(main_frame)
@@ -8011,7 +8758,7 @@ class App(tk.Tk):
                 font=('Arial', 12, 'bold'), bg=self.colors['card'], fg=self.colors['text']).pack(anchor='w')
         
         # Lista de todos os usuários (exceto o próprio admin)
-        all_users = [u for u in self.db.users.keys() if u != self.username]
+        all_users = self.db.usernames_exceto(self.username)
         
         user_var = tk.StringVar()
         user_combo = ttk.Combobox(user_frame, textvariable=user_var, values=all_users, state="readonly", width=30)
@@ -8047,6 +8794,8 @@ class App(tk.Tk):
         secret_question_entry = None
         secret_answer_entry = None
         matricula_entry = None
+        # Dados do usuário selecionado (atualizados apenas em load_user_data)
+        current_data = {}
         
         def show_selected_field(event=None):
             nonlocal email_entry, password_entry, secret_question_entry, secret_answer_entry, matricula_entry
@@ -8063,12 +8812,9 @@ class App(tk.Tk):
                 email_entry = ttk.Entry(dynamic_field_frame, width=40)
                 email_entry.pack(anchor='w', pady=(5, 0))
                 # Carregar valor atual
-                username = user_var.get()
-                if username:
-                    user_data = self.db.get_user_data(username)
-                    if user_data and user_data.get('email'):
-                        email_entry.delete(0, tk.END)
-                        email_entry.insert(0, str(user_data.get('email', '')))
+                if current_data.get('email'):
+                    email_entry.delete(0, tk.END)
+                    email_entry.insert(0, str(current_data.get('email', '')))
             
             elif selected == 'Senha':
                 tk.Label(dynamic_field_frame, text="Nova Senha:", font=('Arial', 11, 'bold'), 
@@ -8082,12 +8828,9 @@ class App(tk.Tk):
                 secret_question_entry = ttk.Entry(dynamic_field_frame, width=40)
                 secret_question_entry.pack(anchor='w', pady=(5, 0))
                 # Carregar valor atual
-                username = user_var.get()
-                if username:
-                    user_data = self.db.get_user_data(username)
-                    if user_data and user_data.get('secret_question'):
-                        secret_question_entry.delete(0, tk.END)
-                        secret_question_entry.insert(0, str(user_data.get('secret_question', '')))
+                if current_data.get('secret_question'):
+                    secret_question_entry.delete(0, tk.END)
+                    secret_question_entry.insert(0, str(current_data.get('secret_question', '')))
             
             elif selected == 'Resposta Secreta':
                 tk.Label(dynamic_field_frame, text="Nova Resposta Secreta:", font=('Arial', 11, 'bold'), 
@@ -8132,12 +8875,9 @@ class App(tk.Tk):
                 matricula_entry = ttk.Entry(dynamic_field_frame, width=40)
                 matricula_entry.pack(anchor='w', pady=(5, 0))
                 # Carregar valor atual
-                username = user_var.get()
-                if username:
-                    user_data = self.db.get_user_data(username)
-                    if user_data and user_data.get('role') == 'aluno' and user_data.get('matricula'):
-                        matricula_entry.delete(0, tk.END)
-                        matricula_entry.insert(0, str(user_data.get('matricula', '')))
+                if current_data.get('role') == 'aluno' and current_data.get('matricula'):
+                    matricula_entry.delete(0, tk.END)
+                    matricula_entry.insert(0, str(current_data.get('matricula', '')))
         
         field_combo.bind("<<ComboboxSelected>>", show_selected_field)
         
@@ -8178,13 +8918,10 @@ class App(tk.Tk):
             perm_label.config(text=f"Permissões: {permissions.get(role, '')}")
             
             # Verificar se houve mudança
-            username = user_var.get()
-            if username:
-                user_data = self.db.get_user_data(username)
-                if user_data and user_data.get('role') != role:
-                    change_warning.config(text="ATENÇÃO: Você alterou o nível de acesso! Clique em 'Salvar Alterações' para confirmar.")
-                else:
-                    change_warning.config(text="")
+            if current_data and current_data.get('role') != role:
+                change_warning.config(text="ATENÇÃO: Você alterou o nível de acesso! Clique em 'Salvar Alterações' para confirmar.")
+            else:
+                change_warning.config(text="")
         
         role_combo.bind("<<ComboboxSelected>>", update_permissions_info)
         
@@ -8201,7 +8938,9 @@ class App(tk.Tk):
                 return
             
             user_data = self.db.get_user_data(username)
+            current_data.clear()
             if user_data:
+                current_data.update(user_data)
                 role_var.set(user_data.get('role', ''))
                 status_var.set(user_data.get('status', 'approved'))
                 update_permissions_info()
@@ -8317,7 +9056,7 @@ class App(tk.Tk):
                     self.db.save_users()
                     messagebox.showinfo("Sucesso", "Usuário excluído com sucesso")
                     # Atualizar lista
-                    all_users = [u for u in self.db.users.keys() if u != self.username]
+                    all_users = self.db.usernames_exceto(self.username)
                     user_combo['values'] = all_users
                     if all_users:
                         user_combo.set(all_users[0])
@@ -8543,21 +9282,15 @@ class App(tk.Tk):
                 return
             
             # Extrair notas do servidor (TODAS as notas vêm do servidor C)
-            partes = aluno_info.split(', ')
-            nome = partes[1].split(': ')[1]
-            np1 = np2 = pim = media = exame = "0.0"
-            for p in partes[2:]:
-                if p.startswith('NP1:'): np1 = p.split(': ')[1]
-                elif p.startswith('NP2:'): np2 = p.split(': ')[1]
-                elif p.startswith('PIM:'): pim = p.split(': ')[1]
-                elif p.startswith('Média:'): media = p.split(': ')[1]
-                elif p.startswith('Exame:'): exame = p.split(': ')[1]
+            campos = _campos_linha(aluno_info)
+            nome = campos.get('Nome', '')
+            np1, np2, pim, media, exame = (campos.get(c, "0.0") for c in ('NP1', 'NP2', 'PIM', 'Média', 'Exame'))
             
             # Buscar informações da turma
             turma_resp = self._send_request(f"GET_TURMA_DATA|{id_turma}")
             disciplina = "N/A"
             if turma_resp and "ERRO" not in turma_resp:
-                disciplina, _ = turma_resp.split('|')
+                disciplina, _, _ = turma_resp.partition('|')
             
             # Exibir informações básicas
             tk.Label(content_frame, text=f"Nome: {nome}", 
@@ -8685,8 +9418,9 @@ class App(tk.Tk):
         # Contar faltas
         faltas = 0
         try:
+            mat_int = int(matricula)
             for rec in read_presencas_dat(id_turma):
-                if rec.get('matricula') == int(matricula) and not rec.get('presente'):
+                if rec.get('matricula') == mat_int and not rec.get('presente'):
                     faltas += 1
         except Exception:
             pass
@@ -8794,7 +9528,8 @@ class App(tk.Tk):
             
             try:
                 presencas = read_presencas_dat(id_turma)
-                minhas_presencas = [p for p in presencas if p.get('matricula') == int(matricula)]
+                mat_int = int(matricula)
+                minhas_presencas = [p for p in presencas if p.get('matricula') == mat_int]
                 
                 # Ordenar por data
                 minhas_presencas.sort(key=lambda x: x.get('date', ''))
@@ -8885,34 +9620,18 @@ class App(tk.Tk):
         foto_path = user_data.get('foto_perfil')
         foto_label = tk.Label(foto_frame, bg=self.colors['card'])
         
+        photo = None
         try:
             if foto_path and os.path.exists(foto_path):
-                from PIL import Image, ImageTk, ImageDraw
-                img = Image.open(foto_path)
-                img = img.resize((80, 80), Image.Resampling.LANCZOS)
-                
-                # Criar máscara circular
-                mask = Image.new('L', (80, 80), 0)
-                draw = ImageDraw.Draw(mask)
-                draw.ellipse((0, 0, 80, 80), fill=255)
-                
-                # Aplicar máscara
-                output = Image.new('RGBA', (80, 80), (0, 0, 0, 0))
-                output.paste(img, (0, 0))
-                output.putalpha(mask)
-                
-                photo = ImageTk.PhotoImage(output)
-                foto_label.config(image=photo, bg=self.colors['card'], width=120, height=120)
-                foto_label.image = photo
-            else:
-                # Placeholder se não tiver foto
-                foto_label.config(text="👤", font=('Arial', 30), 
-                                bg=self.colors['border'], fg=self.colors['text_secondary'],
-                                width=10, height=5)
-        except Exception as e:
-            foto_label.config(text="👤", font=('Arial', 30), 
-                            bg=self.colors['border'], fg=self.colors['text_secondary'],
-                            width=10, height=5)
+                photo = self._foto_perfil_redonda(foto_path, 80)
+        except Exception:
+            photo = None
+        if photo is not None:
+            foto_label.config(image=photo, bg=self.colors['card'], width=120, height=120)
+            foto_label.image = photo
+        else:
+            # Placeholder se não tiver foto (ou em caso de erro)
+            self._make_placeholder(foto_label, tamanho_fonte=30, width=10, height=5)
         
         foto_label.pack()
         
@@ -8936,19 +9655,7 @@ class App(tk.Tk):
                     self.db.update_user(self.username, {'foto_perfil': destino})
                     
                     # Recarregar imagem
-                    from PIL import Image, ImageTk, ImageDraw
-                    img = Image.open(destino)
-                    img = img.resize((120, 120), Image.Resampling.LANCZOS)
-                    
-                    mask = Image.new('L', (120, 120), 0)
-                    draw = ImageDraw.Draw(mask)
-                    draw.ellipse((0, 0, 120, 120), fill=255)
-                    
-                    output = Image.new('RGBA', (120, 120), (0, 0, 0, 0))
-                    output.paste(img, (0, 0))
-                    output.putalpha(mask)
-                    
-                    photo = ImageTk.PhotoImage(output)
+                    photo = self._foto_perfil_redonda(destino, 120)
                     foto_label.config(image=photo, bg=self.colors['card'], text='', width=120, height=120)
                     foto_label.image = photo
                     
@@ -9066,7 +9773,7 @@ class App(tk.Tk):
             
             # Validar data de nascimento (formato básico)
             if new_data['data_nascimento']:
-                if not re.match(r'^\d{2}/\d{2}/\d{4}$', new_data['data_nascimento']):
+                if not _DATE_RE.match(new_data['data_nascimento']):
                     messagebox.showerror("Erro", "Data de nascimento inválida! Use o formato DD/MM/AAAA")
                     return
             